@@ -0,0 +1,260 @@
+import abc
+import http.client
+import os
+import queue
+import xml.etree.ElementTree as ElementTree
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+_RETRIES = 3
+
+
+class StorageBackend(abc.ABC):
+    """
+    Remote storage of images. Backend lists files and reads their beginnings, which is enough to read image shapes.
+    Local file system is read directly, without a backend.
+    """
+
+    workers = 1
+
+    @abc.abstractmethod
+    def list_files(self, directory: str, recursive: bool = False, follow_symlinks: bool = True) -> List[str]:
+        """
+        Lists files in a directory.
+        :param directory: Directory in which to list files.
+        :param recursive: If True, files in nested directories are listed too.
+        :param follow_symlinks: If True, directories pointed to by symlinks are listed (if supported by the storage).
+        :return: List of file paths.
+        """
+
+    @abc.abstractmethod
+    def read_range(self, path: str, start: int, size: int) -> bytes:
+        """
+        Reads part of a file.
+        :param path: Path to file.
+        :param start: Offset of the first byte to read.
+        :param size: Number of bytes to read.
+        :return: Read bytes, less than size at the end of the file.
+        """
+
+    def reader(self, path: str) -> Callable[[int], bytes]:
+        """
+        Prepares function reading consecutive parts of a file.
+        :param path: Path to file.
+        :return: Function returning next N bytes of the file.
+        """
+        offset = 0
+
+        def read(size: int) -> bytes:
+            nonlocal offset
+            data = self.read_range(path, offset, size)
+            offset += len(data)
+            return data
+
+        return read
+
+    def relative_path(self, path: str, directory: str) -> str:
+        """
+        Calculates path of a file relative to the listed directory.
+        :param path: Path to file.
+        :param directory: Listed directory.
+        :return: Relative path.
+        """
+        return os.path.relpath(path, directory)
+
+    def close(self) -> None:
+        """
+        Releases backend resources.
+        :return: None
+        """
+
+
+class _ConnectionPool:
+    """
+    Pool of keep-alive HTTP connections to one host.
+    """
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], size: int, timeout: float) -> None:
+        """
+        :param scheme: URL scheme, "http" or "https".
+        :param host: Host name.
+        :param port: Port number, None for scheme default.
+        :param size: Maximum number of idle connections kept in the pool.
+        :param timeout: Socket timeout in seconds.
+        """
+        self._connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        """
+        Sends request using idle connection, or a new one if there is no idle connection. Failed requests and requests
+        finished with server error are retried.
+        :param method: HTTP method.
+        :param url: Path and query of the request.
+        :param headers: Request headers.
+        :return: Response status and body.
+        """
+        for attempt in range(_RETRIES):
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connection_class(self._host, self._port, timeout=self._timeout)
+            try:
+                connection.request(method, url, headers=headers or {})
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if attempt == _RETRIES - 1:
+                    raise
+                continue
+            if response.will_close:
+                connection.close()
+            else:
+                try:
+                    self._idle.put_nowait(connection)
+                except queue.Full:
+                    connection.close()
+            if response.status >= 500 and attempt < _RETRIES - 1:  # Server errors are usually transient
+                continue
+            return response.status, body
+        raise OSError(f'Request {method} {url} failed.')
+
+    def close(self) -> None:
+        """
+        Closes idle connections.
+        :return: None
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HttpBackend(StorageBackend):
+    """
+    S3-compatible object storage accessed through HTTP with path-style URLs (http://host/bucket/key). Objects are
+    listed with paginated ListObjectsV2 requests and only requested byte ranges of objects are fetched. Requests are
+    not signed, so bucket has to allow anonymous access (or be accessed through a signing proxy).
+    """
+
+    def __init__(self, endpoint: str, bucket: str, workers: int = 16, page_size: int = 1000,
+                 timeout: float = 30.0) -> None:
+        """
+        :param endpoint: Storage URL, e.g. "http://localhost:9000".
+        :param bucket: Bucket name.
+        :param workers: Number of concurrent requests and size of the connection pool.
+        :param page_size: Maximum number of objects returned by one listing request.
+        :param timeout: Socket timeout in seconds.
+        """
+        url = urlsplit(endpoint)
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise ValueError(f'Invalid storage endpoint "{endpoint}".')
+        self.bucket = bucket
+        self.workers = workers
+        self.page_size = page_size
+        self._pool = _ConnectionPool(url.scheme, url.hostname, url.port, workers, timeout)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> Tuple['HttpBackend', str]:
+        """
+        Creates backend from URL of a directory.
+        :param url: URL in format "http(s)://host[:port]/bucket[/prefix]".
+        :param kwargs: Additional backend arguments.
+        :return: Backend and prefix of the directory.
+        """
+        parts = urlsplit(url)
+        bucket, _, prefix = parts.path.lstrip('/').partition('/')
+        if not bucket:
+            raise ValueError(f'URL "{url}" does not contain bucket name.')
+        return cls(f'{parts.scheme}://{parts.netloc}', bucket, **kwargs), prefix
+
+    def list_files(self, directory: str, recursive: bool = False, follow_symlinks: bool = True) -> List[str]:
+        prefix = directory.strip('/')
+        prefix = f'{prefix}/' if prefix else ''
+        keys = []
+        token = None
+        while True:
+            query = {'list-type': '2', 'prefix': prefix, 'max-keys': str(self.page_size)}
+            if not recursive:
+                query['delimiter'] = '/'
+            if token is not None:
+                query['continuation-token'] = token
+            status, body = self._pool.request('GET', f'/{quote(self.bucket)}?{urlencode(query)}')
+            if status != 200:
+                raise OSError(f'Listing of bucket "{self.bucket}" failed with status {status}.')
+            root = ElementTree.fromstring(body)
+            for element in root.iter():
+                element.tag = element.tag.rpartition('}')[2]  # Ignore S3 namespace
+            keys.extend(key.text for key in root.findall('Contents/Key') if not key.text.endswith('/'))
+            if root.findtext('IsTruncated') != 'true':
+                return keys
+            token = root.findtext('NextContinuationToken')
+
+    def _get_range(self, path: str, start: int, size: int) -> Tuple[int, bytes]:
+        """
+        Fetches byte range of an object.
+        :param path: Object key.
+        :param start: Offset of the first byte to read.
+        :param size: Number of bytes to read.
+        :return: Response status (206, or 200 if server sent the whole object) and body.
+        """
+        status, body = self._pool.request('GET', f'/{quote(self.bucket)}/{quote(path)}',
+                                          {'Range': f'bytes={start}-{start + size - 1}'})
+        if status == 416:  # Range starts after the end of the object
+            return 206, b''
+        if status not in (200, 206):
+            raise OSError(f'Reading of object "{path}" failed with status {status}.')
+        return status, body
+
+    def read_range(self, path: str, start: int, size: int) -> bytes:
+        status, body = self._get_range(path, start, size)
+        return body[start:start + size] if status == 200 else body
+
+    def reader(self, path: str) -> Callable[[int], bytes]:
+        offset = 0
+        whole = None
+
+        def read(size: int) -> bytes:
+            nonlocal offset, whole
+            if whole is None:
+                status, data = self._get_range(path, offset, size)
+                if status == 200:  # Server does not support ranges, next parts are taken from the whole object
+                    whole = data
+            if whole is not None:
+                data = whole[offset:offset + size]
+            offset += len(data)
+            return data
+
+        return read
+
+    def relative_path(self, path: str, directory: str) -> str:
+        prefix = directory.strip('/')
+        return path[len(prefix):].lstrip('/') if prefix and path.startswith(prefix) else path
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def is_url(location: str) -> bool:
+    """
+    Checks if location is URL of an object storage.
+    :param location: Directory path or URL.
+    :return: True if location is URL.
+    """
+    return urlsplit(location).scheme in ('http', 'https')
+
+
+def open_backend(location: str) -> Tuple[StorageBackend, str]:
+    """
+    Creates backend for a location.
+    :param location: URL in format "http(s)://host[:port]/bucket[/prefix]".
+    :return: Backend and directory path in the backend.
+    """
+    if is_url(location):
+        return HttpBackend.from_url(location)
+    raise ValueError(f'Location "{location}" is not URL of a supported storage.')
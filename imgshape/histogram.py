@@ -0,0 +1,248 @@
+from collections.abc import Mapping
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_BUFFER_SIZE = 65536
+_SHIFT = np.uint64(32)
+_HEIGHT_MASK = np.uint64(0xFFFFFFFF)
+
+
+class ShapeHistogram(Mapping):
+    """
+    Histogram of image shapes kept in NumPy arrays. Every shape is packed into one 64-bit key (width in the high and
+    height in the low 32 bits) and keys are kept sorted together with their counts. Added shapes are buffered and
+    merged into the arrays in bulk, so memory usage does not grow with Python objects per distinct shape. Histogram is
+    a read-only mapping of (width, height) to count.
+    """
+
+    def __init__(self, shapes: Optional[Mapping] = None) -> None:
+        """
+        :param shapes: Dictionary with image shapes to start with.
+        """
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._pending_keys: List[int] = []
+        self._pending_counts: List[int] = []
+        self._order: Optional[np.ndarray] = None
+        if shapes is not None:
+            self.merge(shapes)
+
+    @classmethod
+    def from_arrays(cls,
+                    widths: Iterable[int],
+                    heights: Iterable[int],
+                    counts: Optional[Iterable[int]] = None) -> 'ShapeHistogram':
+        """
+        Creates histogram from columns of shapes.
+        :param widths: Image widths.
+        :param heights: Image heights.
+        :param counts: Number of images with every shape, one image per shape if None.
+        :return: Histogram.
+        """
+        histogram = cls()
+        histogram.add_many(widths, heights, counts)
+        return histogram
+
+    @classmethod
+    def from_histograms(cls, histograms: Iterable['ShapeHistogram']) -> 'ShapeHistogram':
+        """
+        Sums histograms in one merge, so summing many small histograms (e.g. one per directory) sorts keys once.
+        :param histograms: Histograms to sum.
+        :return: Histogram.
+        """
+        keys, counts = [], []
+        for other in histograms:
+            other._flush()  # pylint: disable=protected-access
+            keys.append(other._keys)  # pylint: disable=protected-access
+            counts.append(other._counts)  # pylint: disable=protected-access
+        histogram = cls()
+        if keys:
+            histogram._combine(np.concatenate(keys), np.concatenate(counts))
+        return histogram
+
+    @staticmethod
+    def pack(widths: Iterable[int], heights: Iterable[int]) -> np.ndarray:
+        """
+        Packs shapes into 64-bit keys.
+        :param widths: Image widths.
+        :param heights: Image heights.
+        :return: Array of keys.
+        """
+        widths = np.asarray(widths, dtype=np.uint64)
+        heights = np.asarray(heights, dtype=np.uint64)
+        return (widths << _SHIFT) | heights
+
+    def add(self, shape: Tuple[int, int], count: int = 1) -> None:
+        """
+        Adds image shape. Shapes are buffered and merged into the histogram in batches. Buffer grows with the
+        histogram, so merging cost is amortised over added shapes.
+        :param shape: Image shape (width, height).
+        :param count: Number of images with this shape, negative to remove images.
+        :return: None
+        """
+        width, height = shape
+        self._pending_keys.append((width << 32) | height)
+        self._pending_counts.append(count)
+        if len(self._pending_keys) >= max(_BUFFER_SIZE, len(self._keys)):
+            self._flush()
+
+    def add_many(self,
+                 widths: Iterable[int],
+                 heights: Iterable[int],
+                 counts: Optional[Iterable[int]] = None) -> None:
+        """
+        Adds batch of image shapes.
+        :param widths: Image widths.
+        :param heights: Image heights.
+        :param counts: Number of images with every shape, one image per shape if None.
+        :return: None
+        """
+        keys = self.pack(widths, heights)
+        counts = np.ones(len(keys), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        if len(keys) != len(counts):
+            raise ValueError(f'Got {len(keys)} shapes and {len(counts)} counts.')
+        self._combine(keys, counts)
+
+    def merge(self, other: Mapping) -> None:
+        """
+        Adds shapes of other histogram (e.g. collected by other worker) to this one.
+        :param other: Histogram or dictionary with image shapes.
+        :return: None
+        """
+        if isinstance(other, ShapeHistogram):
+            other._flush()  # pylint: disable=protected-access
+            self._combine(other._keys, other._counts)  # pylint: disable=protected-access
+            return
+        widths, heights, counts = [], [], []
+        for (width, height), count in other.items():
+            widths.append(width)
+            heights.append(height)
+            counts.append(count)
+        self.add_many(widths, heights, counts)
+
+    def _flush(self) -> None:
+        """
+        Merges buffered shapes into the histogram.
+        :return: None
+        """
+        if self._pending_keys:
+            keys = np.array(self._pending_keys, dtype=np.uint64)
+            counts = np.array(self._pending_counts, dtype=np.int64)
+            self._pending_keys = []
+            self._pending_counts = []
+            self._combine(keys, counts)
+
+    def _combine(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        """
+        Merges keys with their counts into the histogram. Counts of equal keys are summed and keys with zero count
+        are removed.
+        :param keys: Array of packed shapes.
+        :param counts: Array of counts.
+        :return: None
+        """
+        if len(keys) == 0:
+            return
+        keys = np.concatenate((self._keys, keys))
+        counts = np.concatenate((self._counts, counts))
+        order = np.argsort(keys, kind='stable')  # Existing keys are one sorted run, which stable sort exploits
+        keys = keys[order]
+        counts = counts[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        keys = keys[starts]
+        counts = np.add.reduceat(counts, starts)
+        nonzero = counts != 0
+        self._keys = keys[nonzero]
+        self._counts = counts[nonzero]
+        self._order = None
+
+    @property
+    def widths(self) -> np.ndarray:
+        """
+        :return: Widths of distinct shapes, sorted by shape.
+        """
+        self._flush()
+        return (self._keys >> _SHIFT).astype(np.int64)
+
+    @property
+    def heights(self) -> np.ndarray:
+        """
+        :return: Heights of distinct shapes, sorted by shape.
+        """
+        self._flush()
+        return (self._keys & _HEIGHT_MASK).astype(np.int64)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """
+        :return: Counts of distinct shapes, sorted by shape.
+        """
+        self._flush()
+        return self._counts
+
+    def total(self) -> int:
+        """
+        Counts all images.
+        :return: Number of images.
+        """
+        self._flush()
+        return int(self._counts.sum())
+
+    def by_count(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Prepares shapes sorted by count. Sort order is cached until the histogram changes.
+        :return: Widths, heights and counts in ascending order of counts.
+        """
+        self._flush()
+        if self._order is None:
+            self._order = np.argsort(self._counts, kind='stable')
+        keys = self._keys[self._order]
+        return (keys >> _SHIFT).astype(np.int64), (keys & _HEIGHT_MASK).astype(np.int64), self._counts[self._order]
+
+    def top(self, k: int) -> List[Tuple[Tuple[int, int], int]]:
+        """
+        Finds the most frequent shapes.
+        :param k: Number of shapes.
+        :return: List of shapes with their counts in descending order of counts.
+        """
+        widths, heights, counts = self.by_count()
+        if k <= 0:
+            return []
+        widths, heights, counts = widths[::-1][:k], heights[::-1][:k], counts[::-1][:k]
+        return list(zip(zip(widths.tolist(), heights.tolist()), counts.tolist()))
+
+    def __getitem__(self, shape: Tuple[int, int]) -> int:
+        try:
+            width, height = shape
+            key = np.uint64((width << 32) | height)
+        except (TypeError, ValueError, OverflowError):
+            raise KeyError(shape) from None
+        self._flush()
+        index = np.searchsorted(self._keys, key)
+        if index == len(self._keys) or self._keys[index] != key:
+            raise KeyError(shape)
+        return int(self._counts[index])
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.widths.tolist(), self.heights.tolist())
+
+    def __len__(self) -> int:
+        self._flush()
+        return len(self._keys)
+
+    def items(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """
+        Iterates over shapes without looking up every shape.
+        :return: Iterator of shapes with their counts, sorted by shape.
+        """
+        return zip(zip(self.widths.tolist(), self.heights.tolist()), self.counts.tolist())
+
+    def to_dict(self) -> dict:
+        """
+        Converts histogram to dictionary.
+        :return: Dictionary with image shapes.
+        """
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.to_dict()!r})'
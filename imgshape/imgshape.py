@@ -1,15 +1,69 @@
 import argparse
+import ast
+import collections
 import csv
+import http.client
+import io
+import json
+import lzma
 import os
+import re
+import signal
 import sys
-from typing import Dict, Optional, Tuple
+import tarfile
+import time
+import zipfile
+import zlib
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import filetype
+import numpy as np
 from matplotlib import pyplot as plt
 from PIL import Image
 
+from imgshape.backends import StorageBackend, is_url, open_backend
+from imgshape.histogram import ShapeHistogram
+from imgshape.progress import ScanProgress
+from imgshape.scheduling import disk_order
+from imgshape.snapshot import DirectorySnapshot
+from imgshape.stats import ShapeStats
 from imgshape.version import __version__
 
+Shapes = Mapping[Tuple[int, int], int]
+GroupedShapes = Dict[str, Shapes]
+
+_ROOT_GROUP = '.'
+_ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+_HEADER_BYTES = 16384
+_MAX_HEADER_BYTES = 1 << 24
+_CHECKPOINT_INTERVAL = 60.0
+_BACKEND_WINDOW = 4  # Files read ahead per backend worker
+# Errors of reading archive members: encrypted members and unsupported compression methods raise RuntimeError
+# (NotImplementedError), corrupted compressed data raises zlib.error or lzma.LZMAError
+_ARCHIVE_ERRORS = (OSError, EOFError, RuntimeError, zlib.error, lzma.LZMAError, zipfile.BadZipFile, tarfile.TarError)
+_SHAPE_KEY = re.compile(r'\s*\((\d+), (\d+)\)\s*')
+
+
+class _CountingFile(io.FileIO):
+    """
+    Binary file counting bytes read from the operating system. Wrapped in io.BufferedReader it counts bytes actually
+    read by a probe (rounded up to the buffer size), without an additional system call.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: Path to file.
+        """
+        super().__init__(path, 'rb')
+        self.read_bytes = 0
+
+    def readinto(self, buffer) -> Optional[int]:
+        size = super().readinto(buffer)
+        self.read_bytes += size or 0
+        return size
+
 
 def _read_csv(path: str) -> Optional[dict]:
     """
@@ -35,151 +89,701 @@ def _read_csv(path: str) -> Optional[dict]:
 
 
 def _save_csv(path: str,
-              data: dict) -> None:
+              data: Union[dict, List[Tuple[object, object]]]) -> None:
     """
-    Saves data to CSV file.
+    Saves data to CSV file. Fields containing comma, quote or line break are quoted with embedded quotes doubled
+    (RFC 4180), so they are read back unchanged.
     :param path: Path to the file for saving data.
-    :param data: Data to save.
+    :param data: Data to save, as a dict or a list of (key, value) rows.
     :return: None
     """
     if data:
         with open(path, 'w') as fw:
-            for key, value in data.items():
-                key = str(key)
-                if ',' in key:
-                    key = f'"{key}"'
-                value = str(value)
-                if ',' in value:
-                    value = f'"{value}"'
-                fw.write(f'{key},{value}\n')
+            writer = csv.writer(fw, lineterminator='\n')
+            rows = data.items() if isinstance(data, dict) else data
+            writer.writerows((str(key), str(value)) for key, value in rows)
 
 
-def _get_picture_list(directory: str, recursive: bool = False, follow_symlinks: bool = True) -> list:
+def _get_picture_list(directory: str,
+                      recursive: bool = False,
+                      follow_symlinks: bool = True,
+                      snapshot: Optional[DirectorySnapshot] = None,
+                      archives: bool = False,
+                      check_content: bool = True,
+                      progress: Optional[ScanProgress] = None) -> list:
     """
     Collects image files in a directory. If recursive is True images are collected in nested directories.
     :param directory: Directory in which to search for images.
     :param recursive: If True, searches for images in nested directories.
     :param follow_symlinks: If True, the search for images will follow directories pointed to by symlinks only if recursive is set to True.
-    :return: List of absolute paths to image files.
-    """
-    if recursive:
-        files = []
-        for root, _, fs in os.walk(directory, followlinks=follow_symlinks):
-            for file in fs:
-                file = os.path.abspath(os.path.join(root, file))
-                if os.path.isfile(file):
-                    files.append(file)
-    else:
-        files = [os.path.abspath(entry.path) for entry in os.scandir(directory) if entry.is_file()]
-    images = [file for file in files if filetype.guess(file) is not None and filetype.guess(file).mime.split('/')[0] == 'image']
+    :param snapshot: Snapshot of directories from previous scan. Directories with unchanged signature are not listed,
+    their images are not returned and their shapes are reused from the snapshot instead. Listed directories are
+    recorded in the snapshot.
+    :param archives: If True, zip and tar archives are collected too.
+    :param check_content: If True, content of every file is checked and only images (and archives) are returned.
+    If False, files are only listed and all of them are returned, so no file is read before it is probed.
+    :param progress: Progress to update with every listed file and with every directory which can not be listed.
+    :return: List of absolute paths to image files (and archives).
+    """
+    files = []
+    pending = [os.path.abspath(directory)]
+    while pending:
+        current = pending.pop()
+        try:
+            signature = snapshot.signature(current) if snapshot is not None else None
+            if signature is not None:
+                subdirs = snapshot.reuse(current, signature)
+                if subdirs is not None:
+                    pending.extend(subdirs)
+                    continue
+            subdirs = []
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if recursive and (follow_symlinks or not entry.is_symlink()):
+                            subdirs.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry.path)
+                        if progress is not None:
+                            progress.listed += 1
+        except OSError:
+            if progress is not None:
+                progress.errors += 1
+            continue
+        if snapshot is not None:
+            snapshot.record(current, signature, subdirs)
+        pending.extend(subdirs)
+    if not check_content:
+        return files
+    images = [file for file in files if _is_image(file) or (archives and _is_archive(file))]
     return images
 
 
+def _is_image(path: str) -> bool:
+    """
+    Checks if file is an image based on its content.
+    :param path: Path to file.
+    :return: True if file is an image.
+    """
+    try:
+        kind = filetype.guess(path)
+    except OSError:
+        return False
+    return kind is not None and kind.mime.split('/')[0] == 'image'
+
+
+def _is_archive(path: str) -> bool:
+    """
+    Checks if file is a zip or tar archive based on its extension.
+    :param path: Path to file.
+    :return: True if file is an archive.
+    """
+    return path.lower().endswith(_ARCHIVE_EXTENSIONS)
+
+
+def _read_header_shape(read: Callable[[int], bytes], header_bytes: int = _HEADER_BYTES) -> Optional[Tuple[int, int]]:
+    """
+    Reads image shape from the beginning of a stream. If image header is longer than read bytes, more bytes are read
+    (doubling their number) until shape can be read.
+    :param read: Function returning next N bytes of the stream (less at the end of the stream).
+    :param header_bytes: Number of bytes read at first.
+    :return: Image shape (width, height), or None if stream does not contain an image.
+    """
+    header = read(header_bytes)
+    kind = filetype.guess(header)
+    if kind is None or kind.mime.split('/')[0] != 'image':
+        return None
+    while True:
+        try:
+            with Image.open(io.BytesIO(header)) as img:
+                return img.size
+        except Exception:  # pylint: disable=broad-except
+            pass
+        if len(header) >= _MAX_HEADER_BYTES:
+            return None
+        more = read(len(header))
+        if not more:
+            return None
+        header += more
+
+
+def _read_archive_shapes(path: str, progress: Optional[ScanProgress] = None) -> Iterator[Tuple[str, Tuple[int, int]]]:
+    """
+    Reads shapes of images inside zip or tar archive without extracting it. Only headers of members are read: zip
+    members are accessed directly through the central directory, tar archives are read as a sequential stream.
+    Unreadable zip members are skipped. Tar stream can not be continued after an error, so the rest of the archive is
+    skipped.
+    :param path: Path to archive.
+    :param progress: Progress to update with bytes read from the archive and with every unreadable member or archive.
+    :return: Iterator of member names and shapes of images.
+    """
+    try:
+        raw = _CountingFile(path)
+    except OSError:
+        if progress is not None:
+            progress.errors += 1
+        return
+    try:
+        with io.BufferedReader(raw) as f:
+            yield from _read_archive_members(f, progress)
+    finally:
+        if progress is not None:
+            progress.bytes += raw.read_bytes
+
+
+def _read_archive_members(f: io.BufferedReader,
+                          progress: Optional[ScanProgress] = None) -> Iterator[Tuple[str, Tuple[int, int]]]:
+    """
+    Reads shapes of images inside opened zip or tar archive.
+    :param f: Opened archive.
+    :param progress: Progress to update with every unreadable member or archive.
+    :return: Iterator of member names and shapes of images.
+    """
+    try:
+        if zipfile.is_zipfile(f):
+            with zipfile.ZipFile(f) as zf:
+                for info in zf.infolist():
+                    if info.is_dir():
+                        continue
+                    try:
+                        with zf.open(info) as member:
+                            shape = _read_header_shape(member.read)
+                    except _ARCHIVE_ERRORS:
+                        if progress is not None:
+                            progress.errors += 1
+                        continue
+                    if shape is not None:
+                        yield info.filename, shape
+        else:
+            f.seek(0)
+            with tarfile.open(fileobj=f, mode='r|*') as tf:
+                for info in tf:
+                    if not info.isfile():
+                        continue
+                    shape = _read_header_shape(tf.extractfile(info).read)
+                    if shape is not None:
+                        yield info.name, shape
+    except _ARCHIVE_ERRORS:
+        if progress is not None:
+            progress.errors += 1
+
+
+def _probe_shapes(files: Iterable[str],
+                  archives: bool = False,
+                  progress: Optional[ScanProgress] = None,
+                  done: Optional[Callable[[str], None]] = None) -> Iterator[Tuple[str, str, Tuple[int, int]]]:
+    """
+    Reads shapes of images.
+    :param files: Listed files. Files which are not images (or archives) are skipped.
+    :param archives: If True, shapes of images inside archives are read too.
+    :param progress: Progress to update with every probed file. Number of bytes read by probes is counted.
+    :param done: Function called with every file after all its shapes were returned (also if it could not be read).
+    :return: Iterator of listed file, image path and image shape. Path of image inside archive is the archive path
+    joined with member name.
+    """
+    for file in files:
+        if progress is not None:
+            progress.files += 1
+        if archives and _is_archive(file):
+            for name, shape in _read_archive_shapes(file, progress=progress):
+                yield file, os.path.join(file, name), shape
+        else:
+            shape = _read_shape(file, progress=progress, check_content=True)
+            if shape is not None:
+                yield file, file, shape
+        if done is not None:
+            done(file)
+
+
+def _probe_backend_shapes(backend: StorageBackend,
+                          files: List[str],
+                          progress: Optional[ScanProgress] = None) -> Iterator[Tuple[str, str, Tuple[int, int]]]:
+    """
+    Reads shapes of images from storage backend. Only beginnings of files are fetched and files are read concurrently
+    by backend workers. At most a few files per worker are read ahead, so memory usage does not depend on the number
+    of files. File which can not be fetched is counted as error.
+    :param backend: Storage backend.
+    :param files: List of file paths in the backend.
+    :param progress: Progress to update with every probed file. Number of fetched bytes is counted.
+    :return: Iterator of file path, image path and image shape.
+    """
+    def read(file: str) -> Tuple[Optional[Tuple[int, int]], int, bool]:
+        fetched = 0
+        reader = backend.reader(file)
+
+        def counting_reader(size: int) -> bytes:
+            nonlocal fetched
+            data = reader(size)
+            fetched += len(data)
+            return data
+
+        try:
+            return _read_header_shape(counting_reader), fetched, False
+        except (OSError, http.client.HTTPException):
+            return None, fetched, True
+
+    def finish(file: str, future) -> Iterator[Tuple[str, str, Tuple[int, int]]]:
+        shape, fetched, failed = future.result()
+        if progress is not None:
+            progress.files += 1
+            progress.bytes += fetched
+            progress.errors += failed
+        if shape is not None:
+            yield file, file, shape
+
+    window = max(1, backend.workers) * _BACKEND_WINDOW
+    with ThreadPoolExecutor(max_workers=backend.workers) as executor:
+        pending = collections.deque()
+        for file in files:
+            pending.append((file, executor.submit(read, file)))
+            if len(pending) >= window:
+                yield from finish(*pending.popleft())
+        while pending:
+            yield from finish(*pending.popleft())
+
+
+def _read_shape(path: str,
+                progress: Optional[ScanProgress] = None,
+                check_content: bool = False) -> Optional[Tuple[int, int]]:
+    """
+    Reads image shape. Only image header is read.
+    :param path: Path to image.
+    :param progress: Progress to update with number of bytes read from the image and with image which can not be read.
+    :param check_content: If True, file type is checked from the first read bytes and file which is not an image is
+    skipped without counting it as an error.
+    :return: Image shape (width, height), or None if file is not an image or image can not be read.
+    """
+    try:
+        raw = _CountingFile(path)
+    except OSError:
+        if progress is not None:
+            progress.errors += 1
+        return None
+    try:
+        with io.BufferedReader(raw) as f:
+            if check_content:
+                kind = filetype.guess(f.peek(_HEADER_BYTES))
+                if kind is None or kind.mime.split('/')[0] != 'image':
+                    return None
+            with Image.open(f) as img:
+                return img.size
+    except Exception:  # pylint: disable=broad-except
+        if progress is not None:
+            progress.errors += 1
+        return None
+    finally:
+        if progress is not None:
+            progress.bytes += raw.read_bytes
+
+
+def _parse_group_by(group_by: str) -> Callable[[str], str]:
+    """
+    Parses group specification and prepares function which assigns images to groups.
+    :param group_by: Group specification in format "depth=N" or "regex=PATTERN". Depth groups images by first N
+    directories of path relative to input directory. Regex groups images by first capturing group (or whole match)
+    of the pattern searched in path relative to input directory.
+    :return: Function returning group name for image path relative to input directory.
+    """
+    kind, sep, value = group_by.partition('=')
+    if not sep:
+        raise ValueError(f'Invalid group specification "{group_by}", expected "depth=N" or "regex=PATTERN".')
+    if kind == 'depth':
+        try:
+            depth = int(value)
+        except ValueError:
+            raise ValueError(f'Invalid group depth "{value}".') from None
+        if depth < 1:
+            raise ValueError(f'Group depth must be positive, got {depth}.')
+
+        def group_by_depth(path: str) -> str:
+            parts = [part for part in os.path.dirname(path).split(os.sep) if part]
+            return '/'.join(parts[:depth]) or _ROOT_GROUP
+
+        return group_by_depth
+    if kind == 'regex':
+        try:
+            pattern = re.compile(value)
+        except re.error as e:
+            raise ValueError(f'Invalid group pattern "{value}": {e}') from None
+
+        def group_by_regex(path: str) -> str:
+            match = pattern.search(path.replace(os.sep, '/'))
+            if match is None:
+                return _ROOT_GROUP
+            return (match.group(1) if pattern.groups else match.group(0)) or _ROOT_GROUP
+
+        return group_by_regex
+    raise ValueError(f'Invalid group specification "{group_by}", expected "depth=N" or "regex=PATTERN".')
+
+
+def _is_grouped(shapes: Union[Shapes, GroupedShapes]) -> bool:
+    """
+    Checks if shapes are grouped.
+    :param shapes: Dictionary with image shapes or dictionary with image shapes per group.
+    :return: True if shapes are grouped.
+    """
+    if isinstance(shapes, ShapeHistogram):
+        return False
+    return any(isinstance(value, Mapping) for value in shapes.values())
+
+
+def _parse_shape_key(key: str) -> Tuple[Optional[str], Tuple[int, int]]:
+    """
+    Parses key of saved shapes list.
+    :param key: Key in format "(width, height)" or "('group', (width, height))".
+    :return: Group name (None if key is not grouped) and shape.
+    """
+    match = _SHAPE_KEY.fullmatch(key)
+    if match is not None:  # Plain shapes are parsed without evaluating the key
+        return None, (int(match.group(1)), int(match.group(2)))
+    try:
+        value = ast.literal_eval(key.strip())
+    except (ValueError, SyntaxError):
+        raise ValueError(f'Invalid shape "{key}".') from None
+    group = None
+    if isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], str):
+        group, value = value
+    if not isinstance(value, tuple) or len(value) != 2 or not all(isinstance(v, int) for v in value):
+        raise ValueError(f'Invalid shape "{key}".')
+    return group, value
+
+
+def _save_shapes(path: str, shapes: Union[Shapes, GroupedShapes]) -> None:
+    """
+    Saves shapes to CSV file. Grouped shapes are saved in one list with keys in format (group, (width, height)).
+    Keys are formatted directly from histogram columns, sorted by shape.
+    :param path: Path to the file for saving shapes.
+    :param shapes: Dictionary with image shapes or dictionary with image shapes per group.
+    :return: None
+    """
+    groups = shapes.items() if _is_grouped(shapes) else [(None, shapes)]
+    rows = []
+    for group, group_shapes in groups:
+        histogram = group_shapes if isinstance(group_shapes, ShapeHistogram) else ShapeHistogram(group_shapes)
+        prefix, suffix = (f'({group!r}, ', ')') if group is not None else ('', '')
+        rows.extend((f'{prefix}({width}, {height}){suffix}', count) for width, height, count
+                    in zip(histogram.widths.tolist(), histogram.heights.tolist(), histogram.counts.tolist()))
+    _save_csv(path, rows)
+
+
 def _get_shapes(directory: Optional[str] = None,
                 recursive: bool = False,
                 follow_symlinks: bool = True,
-                read_file: Optional[str] = None) -> Dict[Tuple[int, int], int]:
+                read_file: Optional[str] = None,
+                group_by: Optional[str] = None,
+                stats: Optional[ShapeStats] = None,
+                snapshot: Optional[DirectorySnapshot] = None,
+                archives: bool = False,
+                backend: Optional[StorageBackend] = None,
+                io_order: Optional[str] = None,
+                progress: Optional[ScanProgress] = None,
+                checkpoint_file: Optional[str] = None,
+                checkpoint_interval: float = _CHECKPOINT_INTERVAL) -> Union[ShapeHistogram, Dict[str, ShapeHistogram]]:
     """
     Reads files and prepares images shapes dictionary.
     :param directory: Input directory to search images.
     :param recursive: True if images must be searched in subdirectories.
     :param follow_symlinks: True if images must be searched in directories pointed to by symbolic links.
     :param read_file: Path to file with saved list of shapes tp read instead of checking images.
-    :return:None
+    :param group_by: Group specification ("depth=N" or "regex=PATTERN"). If given, shapes are collected separately
+    for each group in one pass. Ignored when shapes are read from file, saved groups are restored instead.
+    :param stats: Statistics to update with every read shape.
+    :param snapshot: Snapshot of directories from previous scan. Shapes of unchanged directories are reused from it
+    and shapes of rescanned directories are recorded in it.
+    :param archives: True if images inside zip and tar archives must be checked too.
+    :param backend: Storage backend containing the input directory. If None, images are read from local file system.
+    Directory snapshot and archives are supported only in local file system.
+    :param io_order: Order of reading local images: None for listing order, "inode" or "extent" to read them in
+    batches sorted by inode number or physical position on disk, with readahead of the next batch.
+    :param progress: Progress to update during the scan.
+    :param checkpoint_file: Path to file to periodically save directory snapshot to (requires snapshot). Only
+    directories whose all images were probed are saved, so the scan can be resumed from the checkpoint loaded as
+    snapshot. Checkpoint is also saved when the scan is interrupted by an exception.
+    :param checkpoint_interval: Minimum time between checkpoints in seconds.
+    :return: Histogram of image shapes, or dictionary with histogram per group if images are grouped.
     """
-    shapes = dict()
     if read_file is not None:  # Read shapes from file
         _shapes = _read_csv(read_file)
-        shapes = {}
         if _shapes is None:
             raise ValueError(f'Input file "{read_file}" does not exist or corrupted.')
-        for shape_key in _shapes:
-            if not isinstance(shape_key, str):
+        columns = {}
+        for shape_key, value in _shapes.items():
+            try:
+                group, (width, height) = _parse_shape_key(shape_key)
+                count = int(value)
+            except ValueError:
+                raise ValueError(f'Input file "{read_file}" corrupted.') from None
+            widths, heights, counts = columns.setdefault(group, ([], [], []))
+            widths.append(width)
+            heights.append(height)
+            counts.append(count)
+        if None in columns:
+            if len(columns) > 1:
                 raise ValueError(f'Input file "{read_file}" corrupted.')
-            key = tuple(map(int, shape_key.strip('() ').split(',')))
-            val = int(_shapes[shape_key])
-            shapes[key] = val
-    elif directory is not None:  # Search for images and read shapes
-        images = _get_picture_list(directory=directory, recursive=recursive, follow_symlinks=follow_symlinks)
-        if len(images) == 0:
-            raise ValueError(f'Input directory "{directory}" does not contain any images.')
-    else:
+            shapes = ShapeHistogram.from_arrays(*columns[None])
+        else:
+            shapes = {group: ShapeHistogram.from_arrays(*column) for group, column in columns.items()}
+        if stats is not None:
+            stats.add_shapes(shapes)
+        return shapes
+
+    if directory is None:
         raise ValueError('Either input file or directory must be specified.')
+    group_of = _parse_group_by(group_by) if group_by is not None else None
+    shapes = ShapeHistogram() if group_of is None else {}
+    if checkpoint_file is not None and snapshot is None:
+        raise ValueError('Checkpoints require directory snapshot.')
+    if backend is not None:
+        if snapshot is not None or archives:
+            raise ValueError('Directory snapshot and archives are supported only in local file system.')
+        images = backend.list_files(directory, recursive=recursive, follow_symlinks=follow_symlinks)
+        probes = _probe_backend_shapes(backend, images, progress=progress)
+        relative_path = backend.relative_path
+    else:
+        images = _get_picture_list(directory=directory, recursive=recursive, follow_symlinks=follow_symlinks,
+                                   snapshot=snapshot, archives=archives, check_content=False, progress=progress)
+        last_checkpoint = time.monotonic()
 
-    if not shapes.keys():
-        for image in images:
-            try:
-                img = Image.open(image)
-            except Exception:  # pylint: disable=broad-except
+        def done(file: str) -> None:  # Checkpoint after any finished file, also the one without images
+            nonlocal last_checkpoint
+            snapshot.done(file)
+            if checkpoint_file is not None and time.monotonic() - last_checkpoint >= checkpoint_interval:
+                snapshot.save(checkpoint_file, complete_only=True)
+                last_checkpoint = time.monotonic()
+
+        if snapshot is not None:
+            snapshot.expect(images)
+        ordered = disk_order(images, order=io_order) if io_order is not None else images
+        probes = _probe_shapes(ordered, archives=archives, progress=progress,
+                               done=done if snapshot is not None else None)
+        relative_path = os.path.relpath
+    if len(images) == 0 and (snapshot is None or not snapshot.reused):
+        raise ValueError(f'Input directory "{directory}" does not contain any images.')
+    if progress is not None:
+        progress.listed = progress.total = len(images)
+    if snapshot is not None and stats is not None:
+        stats.add_shapes(snapshot.shapes(snapshot.reused))
+
+    try:
+        for file, image, s in probes:
+            if stats is not None:
+                stats.add(*s)
+            group = group_of(relative_path(image, directory)) if group_of is not None else None
+            if snapshot is not None:
+                snapshot.add(os.path.dirname(file), group, s)
                 continue
-            s = img.size
-            if s in shapes:
-                shapes[s] += 1
-            else:
-                shapes[s] = 1
+            target = shapes if group is None else shapes.get(group)
+            if target is None:
+                target = shapes[group] = ShapeHistogram()
+            target.add(s)
+    except BaseException:  # Keep work done so far also on KeyboardInterrupt
+        if checkpoint_file is not None:
+            snapshot.save(checkpoint_file, complete_only=True)
+        raise
 
+    if snapshot is not None:
+        shapes = snapshot.shapes()
+    if not shapes:
+        raise ValueError(f'Input directory "{directory}" does not contain any images.')
     return shapes
 
 
-def plot_shapes(shapes: dict) -> None:
+def _scatter_shapes(ax: plt.Axes, shapes: Shapes, label: Optional[str] = None, **kwargs) -> tuple:
     """
-    Plots images shapes distribution.
-    :param shapes: Dictionary with image shapes.
-    :return: None
+    Draws images shapes as scatter plot with point size proportional to images count.
+    :param ax: Axes to draw on.
+    :param shapes: Histogram or dictionary with image shapes.
+    :param label: Label of the scatter plot used in legend.
+    :param kwargs: Additional arguments passed to scatter.
+    :return: Drawn points and histogram of drawn shapes. Points are drawn in order of histogram.by_count().
     """
-    res, count = zip(*list(sorted(shapes.items(), key=lambda x: x[1])))
-    if len(res) > 1:
+    histogram = shapes if isinstance(shapes, ShapeHistogram) else ShapeHistogram(shapes)
+    widths, heights, counts = histogram.by_count()
+    if counts[-1] > counts[0]:
         min_diameter = 1
-        max_diameter = int((max(max(res)) - min(min(res))) * 0.1)
-        a = (max_diameter - min_diameter) / (max(count) - min(count))
-        b = min_diameter - a * min(count)
-        diameters = [c * a + b for c in count]
+        max_diameter = int((max(widths.max(), heights.max()) - min(widths.min(), heights.min())) * 0.1)
+        diameters = min_diameter + (counts - counts[0]) * ((max_diameter - min_diameter) / (counts[-1] - counts[0]))
     else:
-        diameters = [50]
-    points = plt.scatter(*zip(*res), s=diameters, alpha=0.5, c='deepskyblue', edgecolors='mediumblue')
+        diameters = np.full(len(counts), 50)
+    points = ax.scatter(widths, heights, s=diameters, alpha=0.5, label=label, **kwargs)
+    return points, histogram
+
+
+def plot_shapes(shapes: Union[Shapes, GroupedShapes], layout: str = 'overlay', show: bool = True) -> int:
+    """
+    Plots images shapes distribution.
+    :param shapes: Dictionary with image shapes or dictionary with image shapes per group.
+    :param layout: Layout of grouped shapes: "overlay" draws all groups on one plot, "facet" draws each group on
+    separate subplot. Ignored if shapes are not grouped.
+    :param show: True if plot window has to be shown. Otherwise, shapes are only drawn on the current figure.
+    :return: Connection id of the hover handler, to be disconnected with mpl_disconnect before redrawing the figure.
+    """
+    if layout not in ('overlay', 'facet'):
+        raise ValueError(f'Invalid layout "{layout}", expected "overlay" or "facet".')
+    title = 'Distribution of the number of images in relation to resolution.'
+    if not _is_grouped(shapes):
+        ax = plt.gca()
+        points, histogram = _scatter_shapes(ax, shapes, c='deepskyblue', edgecolors='mediumblue')
+        plots = [(ax, points, histogram, None)]
+        ax.set_title(f'{title}\nMax count res: {histogram.top(1)[0][0]}\n')
+    elif layout == 'overlay':
+        ax = plt.gca()
+        plots = []
+        for group, group_shapes in sorted(shapes.items()):
+            points, histogram = _scatter_shapes(ax, group_shapes, label=group)
+            plots.append((ax, points, histogram, group))
+        ax.legend()
+        ax.set_title(f'{title}\n')
+    else:
+        groups = sorted(shapes)
+        cols = min(len(groups), 3)
+        rows = (len(groups) + cols - 1) // cols
+        fig = plt.gcf()
+        axes = fig.subplots(rows, cols, squeeze=False, sharex=True, sharey=True)
+        fig.suptitle(title)
+        plots = []
+        for ax, group in zip(axes.flat, groups):
+            points, histogram = _scatter_shapes(ax, shapes[group], c='deepskyblue', edgecolors='mediumblue')
+            plots.append((ax, points, histogram, group))
+            ax.set_title(f'{group}\nMax count res: {histogram.top(1)[0][0]}\n')
+        for ax in list(axes.flat)[len(groups):]:
+            ax.set_visible(False)
+    for ax, *_ in plots:
+        ax.set_xlabel('Horizontal resolution')
+        ax.set_ylabel('Vertical resolution')
 
     def on_hover(event):
-        if event.inaxes == plt.gca():
+        for ax, points, histogram, group in plots:
+            if event.inaxes != ax:
+                continue
             contains, ind = points.contains(event)
             if contains:
-                r = res[ind["ind"][0]]
-                c = count[ind["ind"][0]]
-                p = plt.gca()
-                title = '\n'.join(p.get_title().split('\n')[:-1])
-                title += f'\nResolution: ({r[0]}x{r[1]}), Images count: {c}'
-                p.set_title(title)
-                plt.show()
-            else:
-                p = plt.gca()
-                p.set_title('\n'.join(p.get_title().split('\n')[:-1]) + '\n')
-
-    plt.gcf().canvas.mpl_connect('motion_notify_event', on_hover)
-
-    plt.title('Distribution of the number of images in relation to resolution.\n'
-              f'Max count res: {res[count.index(max(count))]}\n')
-    plt.xlabel('Horizontal resolution')
-    plt.ylabel('Vertical resolution')
-    plt.show()
+                widths, heights, counts = histogram.by_count()
+                i = ind["ind"][0]
+                info = f'Resolution: ({widths[i]}x{heights[i]}), Images count: {counts[i]}'
+                if group is not None and layout == 'overlay':
+                    info = f'Group: {group}, {info}'
+                ax.set_title('\n'.join(ax.get_title().split('\n')[:-1]) + f'\n{info}')
+                plt.draw()
+                return
+        if event.inaxes is not None:
+            p = event.inaxes
+            p.set_title('\n'.join(p.get_title().split('\n')[:-1]) + '\n')
+
+    handler = plt.gcf().canvas.mpl_connect('motion_notify_event', on_hover)
+    if show:
+        plt.show()
+    return handler
+
+
+def _snapshot_path(save_file: str) -> str:
+    """
+    Prepares path of directories snapshot kept next to the save file.
+    :param save_file: Path to file with saved list of shapes.
+    :return: Path to snapshot file.
+    """
+    return f'{save_file}.snapshot.json'
+
+
+def _checkpoint_path(save_file: str) -> str:
+    """
+    Prepares path of scan checkpoint kept next to the save file.
+    :param save_file: Path to file with saved list of shapes.
+    :return: Path to checkpoint file.
+    """
+    return f'{save_file}.checkpoint.json'
 
 
 def read_shapes(directory: str,
                 recursive: bool = False,
                 follow_symlinks: bool = True,
                 read_file: Optional[str] = None,
-                save_file: Optional[str] = None) -> None:
+                save_file: Optional[str] = None,
+                group_by: Optional[str] = None,
+                layout: str = 'overlay',
+                stats_format: Optional[str] = None,
+                plot: bool = True,
+                update: bool = False,
+                archives: bool = False,
+                io_order: Optional[str] = None,
+                show_progress: bool = False,
+                metrics_file: Optional[str] = None,
+                checkpoint_interval: Optional[float] = None,
+                resume: bool = False) -> None:
     """
     Reads shapes of images and displays their distribution and minimum and maximum values.
-    :param directory: Input directory to search images.
+    :param directory: Input directory to search images, or URL of object storage directory in format
+    "http(s)://host[:port]/bucket[/prefix]".
     :param recursive: True if images must be searched in subdirectories.
     :param follow_symlinks: True if images must be searched in directories pointed to by symbolic links.
     :param read_file: Path to file with saved list of shapes tp read instead of checking images.
     :param save_file: Path to file to save list of shapes.
+    :param group_by: Group specification ("depth=N" or "regex=PATTERN") to collect shapes per group.
+    :param layout: Layout of grouped shapes plot ("overlay" or "facet").
+    :param stats_format: Format of printed summary statistics ("text" or "json"), None to not print statistics.
+    :param plot: True if shapes distribution must be plotted.
+    :param update: True if save file has to be updated. Snapshot of directories is kept next to the save file and only
+    directories changed since the previous update are rescanned.
+    :param archives: True if images inside zip and tar archives must be checked too.
+    :param io_order: Order of reading local images ("inode" or "extent"), None for listing order.
+    :param show_progress: True if scan progress has to be printed to standard error.
+    :param metrics_file: Path to file to export scan metrics to in Prometheus textfile format.
+    :param checkpoint_interval: Time between checkpoints in seconds, None to not write checkpoints. Checkpoint with
+    shapes of completely probed directories is kept next to the save file and removed when the scan is finished.
+    :param resume: True if scan has to be resumed from the checkpoint of an interrupted scan. Directories saved in
+    the last checkpoint (and not changed since) are not probed again. Checkpoints are written also if
+    checkpoint_interval is None.
     :return:None
     """
-    shapes = _get_shapes(directory=directory, recursive=recursive, follow_symlinks=follow_symlinks, read_file=read_file)
+    if resume and checkpoint_interval is None:
+        checkpoint_interval = _CHECKPOINT_INTERVAL
+    snapshot = None
+    checkpoint_file = None
+    if update or checkpoint_interval is not None:
+        if save_file is None or read_file is not None or (directory is not None and is_url(directory)):
+            raise ValueError('Update and checkpoints require input directory and save file.')
+        options = {'recursive': recursive, 'follow_symlinks': follow_symlinks, 'group_by': group_by,
+                   'archives': archives}
+        if update:
+            snapshot = DirectorySnapshot.load(_snapshot_path(save_file), directory, **options)
+        else:
+            snapshot = DirectorySnapshot(directory, **options)
+        if checkpoint_interval is not None:
+            checkpoint_file = _checkpoint_path(save_file)
+            if resume:
+                snapshot.previous.update(DirectorySnapshot.load(checkpoint_file, directory, **options).previous)
+    backend = None
+    if read_file is None and directory is not None and is_url(directory):
+        backend, directory = open_backend(directory)
+    stats = ShapeStats() if stats_format is not None else None
+    progress = None
+    if read_file is None and (show_progress or metrics_file is not None):
+        progress = ScanProgress(stream=sys.stderr if show_progress else None, metrics_file=metrics_file)
+        progress.start()
+    try:
+        shapes = _get_shapes(directory=directory, recursive=recursive, follow_symlinks=follow_symlinks,
+                             read_file=read_file, group_by=group_by, stats=stats, snapshot=snapshot,
+                             archives=archives, backend=backend, io_order=io_order, progress=progress,
+                             checkpoint_file=checkpoint_file,
+                             checkpoint_interval=checkpoint_interval if checkpoint_interval is not None
+                             else _CHECKPOINT_INTERVAL)
+    finally:
+        if progress is not None:
+            progress.stop()
+        if backend is not None:
+            backend.close()
     if save_file is not None:
-        _save_csv(save_file, shapes)
-    plot_shapes(shapes)
+        _save_shapes(save_file, shapes)
+        if update:
+            snapshot.save(_snapshot_path(save_file))
+        if checkpoint_file is not None and os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+    if stats_format == 'json':
+        print(json.dumps(stats.to_dict(), indent=2))
+    elif stats_format is not None:
+        print(stats.format_text())
+    if plot:
+        plot_shapes(shapes, layout=layout)
 
 
 def main() -> None:
@@ -191,7 +795,8 @@ def main() -> None:
                                      description='The program checks the shape of images and shows them distribution '
                                                  'and minimum and maximum values.')
     parser.add_argument('-i', '--inputdir',
-                        help='Input directory with images to check the shape of the images.',
+                        help='Input directory with images to check the shape of the images. It can be also URL of '
+                             'S3-compatible object storage directory ("http(s)://host[:port]/bucket[/prefix]").',
                         action='store')
     parser.add_argument('-R', '--recursive',
                         help='Check images in all subdirectories.',
@@ -205,14 +810,127 @@ def main() -> None:
     parser.add_argument('-s', '--save',
                         help='Saves list of shapes to CSV file',
                         action='store')
+    parser.add_argument('-g', '--group-by',
+                        help='Collects shapes separately for each group in one pass. Groups are defined by first N '
+                             'subdirectories ("depth=N") or by regular expression matched against image path relative '
+                             'to input directory ("regex=PATTERN").',
+                        action='store')
+    parser.add_argument('-l', '--layout',
+                        help='Layout of grouped shapes plot: "overlay" (default) or "facet".',
+                        choices=('overlay', 'facet'),
+                        default='overlay',
+                        action='store')
+    parser.add_argument('-a', '--archives',
+                        help='Checks images inside zip and tar archives without extracting them.',
+                        action='store_true')
+    parser.add_argument('-o', '--io-order',
+                        help='Reads images in batches sorted by their position on disk, requesting readahead of the '
+                             'next batch: "inode" sorts by inode number, "extent" by physical offset where available. '
+                             'Speeds up cold scans of spinning disks.',
+                        choices=('inode', 'extent'),
+                        action='store')
+    parser.add_argument('-P', '--progress',
+                        help='Prints scan progress (files/s, bytes/s, ETA and errors) to standard error.',
+                        action='store_true')
+    parser.add_argument('-m', '--metrics-file',
+                        help='Exports scan progress metrics to file in Prometheus textfile format.',
+                        action='store')
+    parser.add_argument('-u', '--update',
+                        help='Updates existing save file. Snapshot of directories is kept next to the save file and '
+                             'only directories changed since the previous update are rescanned.',
+                        action='store_true')
+    parser.add_argument('-c', '--checkpoint-interval',
+                        help='Writes checkpoint of the scan next to the save file every CHECKPOINT_INTERVAL seconds. '
+                             'Checkpoint is removed when the scan is finished.',
+                        type=float,
+                        action='store')
+    parser.add_argument('--resume',
+                        help='Resumes interrupted scan from its checkpoint. Directories saved in the last checkpoint '
+                             'are not probed again. Checkpoints are written every 60 seconds unless '
+                             '--checkpoint-interval is given.',
+                        action='store_true')
+    parser.add_argument('-t', '--stats',
+                        help='Prints summary statistics of shapes (minimum, maximum, quantiles, aspect ratios and '
+                             'megapixels) as "text" or "json".',
+                        choices=('text', 'json'),
+                        action='store')
+    parser.add_argument('-n', '--noplot',
+                        help='Does not plot shapes distribution.',
+                        action='store_true')
     parser.add_argument('-V', '--version', help='Program version', action='store_true')
+    subparsers = parser.add_subparsers(dest='command', metavar='{watch}')
+    watch_parser = subparsers.add_parser('watch',
+                                         help='Scans input directory once and then keeps shapes up to date by '
+                                              'probing only created, modified and deleted files.')
+    watch_parser.add_argument('-i', '--inputdir',
+                              help='Input directory to watch.',
+                              required=True,
+                              action='store')
+    watch_parser.add_argument('-R', '--recursive',
+                              help='Watch images in all subdirectories.',
+                              action='store_true')
+    watch_parser.add_argument('-S', '--followsymlinks',
+                              help='Follow directories pointed to by symbolic links when searching for images.',
+                              action='store_true')
+    watch_parser.add_argument('-g', '--group-by',
+                              help='Collects shapes separately for each group ("depth=N" or "regex=PATTERN").',
+                              action='store')
+    watch_parser.add_argument('-s', '--save',
+                              help='Saves list of shapes to CSV file on every flush. Existing file is overwritten.',
+                              action='store')
+    watch_parser.add_argument('-p', '--plot',
+                              help='Refreshes shapes distribution plot on every flush.',
+                              action='store_true')
+    watch_parser.add_argument('-l', '--layout',
+                              help='Layout of grouped shapes plot: "overlay" (default) or "facet".',
+                              choices=('overlay', 'facet'),
+                              default='overlay',
+                              action='store')
+    watch_parser.add_argument('-f', '--flush-interval',
+                              help='Minimum time between flushes of changed shapes in seconds (default: 10).',
+                              type=float,
+                              default=10.0,
+                              action='store')
+    watch_parser.add_argument('--poll',
+                              help='Polls input directory instead of using inotify.',
+                              action='store_true')
+    watch_parser.add_argument('--poll-interval',
+                              help='Time between polls in seconds (default: 5).',
+                              type=float,
+                              default=5.0,
+                              action='store')
     args = parser.parse_args()
 
     if args.version:
         print(f'c2bw version: {__version__}')
         sys.exit(0)
 
-    if args.read is None:
+    if args.command == 'watch':
+        if not os.path.isdir(args.inputdir):
+            print(f'Input directory "{args.inputdir}" is not a directory.')
+            sys.exit(1)
+        from imgshape.watch import watch_shapes  # pylint: disable=import-outside-toplevel
+        try:
+            watch_shapes(directory=os.path.abspath(args.inputdir),
+                         recursive=args.recursive,
+                         follow_symlinks=args.followsymlinks,
+                         group_by=args.group_by,
+                         save_file=os.path.abspath(args.save) if args.save is not None else None,
+                         flush_interval=args.flush_interval,
+                         poll_interval=args.poll_interval,
+                         polling=args.poll,
+                         plot=args.plot,
+                         layout=args.layout)
+        except Exception as e:  # pylint: disable=broad-except
+            print('#' * 50)
+            print(f'Error: {e}')
+        sys.exit(0)
+
+    if args.read is None and args.inputdir is not None and is_url(args.inputdir):
+        if args.update or args.archives or args.checkpoint_interval is not None or args.resume:
+            print('Update, archives and checkpoints are supported only for local input directory.')
+            sys.exit(1)
+    elif args.read is None:
         if args.inputdir is None or not os.path.exists(args.inputdir):
             print(f'Input directory "{args.inputdir}" does not exist.')
             sys.exit(1)
@@ -232,19 +950,37 @@ def main() -> None:
             args.read = os.path.abspath(args.read)
 
     # Check save file
+    checkpoints = args.checkpoint_interval is not None or args.resume
+    if (args.update or checkpoints) and (args.save is None or args.read is not None):
+        print('Update and checkpoints require input directory and save file.')
+        sys.exit(1)
     if args.save is not None:
-        if os.path.exists(args.save):
+        resumed = args.resume and os.path.exists(_checkpoint_path(args.save))
+        if os.path.exists(args.save) and not (args.update or resumed):
             print(f'Output file "{args.save}" already exist.')
             sys.exit(1)
         if not os.path.isabs(args.save):
             args.save = os.path.abspath(args.save)
+    if checkpoints:  # Preempted scan exits through the exception handler which saves the checkpoint
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
 
     try:
         read_shapes(directory=args.inputdir,
                     recursive=args.recursive,
                     follow_symlinks=args.followsymlinks,
                     read_file=args.read,
-                    save_file=args.save)
+                    save_file=args.save,
+                    group_by=args.group_by,
+                    layout=args.layout,
+                    stats_format=args.stats,
+                    plot=not args.noplot,
+                    update=args.update,
+                    archives=args.archives,
+                    io_order=args.io_order,
+                    show_progress=args.progress,
+                    metrics_file=os.path.abspath(args.metrics_file) if args.metrics_file is not None else None,
+                    checkpoint_interval=args.checkpoint_interval,
+                    resume=args.resume)
     except Exception as e:  # pylint: disable=broad-except
         print('#' * 50)
         print(f'Error: {e}')
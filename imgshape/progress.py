@@ -0,0 +1,184 @@
+import os
+import sys
+import threading
+import time
+from typing import Optional, TextIO
+
+_METRICS = (
+    ('imgshape_scan_listed_files', 'gauge', 'Number of files listed so far.', 'listed'),
+    ('imgshape_scan_probed_files_total', 'counter', 'Number of probed files.', 'files'),
+    ('imgshape_scan_probed_bytes_total', 'counter', 'Number of bytes read by probes.', 'bytes'),
+    ('imgshape_scan_errors_total', 'counter', 'Number of files which could not be probed.', 'errors'),
+    ('imgshape_scan_files_per_second', 'gauge', 'Files probed per second since the previous report.', 'files_rate'),
+    ('imgshape_scan_bytes_per_second', 'gauge', 'Bytes probed per second since the previous report.', 'bytes_rate'),
+    ('imgshape_scan_start_time_seconds', 'gauge', 'Unix time of the scan start.', 'start_time'),
+    ('imgshape_scan_last_progress_time_seconds', 'gauge', 'Unix time of the last listed or probed file.',
+     'last_progress_time'),
+    ('imgshape_scan_running', 'gauge', '1 if the scan is running, 0 if it is finished.', 'running'),
+)
+
+
+def _format_size(size: float) -> str:
+    """
+    Formats number of bytes.
+    :param size: Number of bytes.
+    :return: Formatted size.
+    """
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TiB'
+
+
+def _format_duration(seconds: float) -> str:
+    """
+    Formats duration.
+    :param seconds: Duration in seconds.
+    :return: Duration in format H:MM:SS.
+    """
+    seconds = int(seconds)
+    return f'{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
+
+
+class ScanProgress:
+    """
+    Progress of a scan. The scan only increments counters, reporting is done by a background thread at most once per
+    interval, so it does not slow down the scan. Progress is printed as one refreshed line and optionally exported
+    in Prometheus textfile format.
+    """
+
+    def __init__(self,
+                 interval: float = 1.0,
+                 stream: Optional[TextIO] = sys.stderr,
+                 metrics_file: Optional[str] = None) -> None:
+        """
+        :param interval: Time between reports in seconds.
+        :param stream: Stream to print progress to, None to not print progress.
+        :param metrics_file: Path to file to export metrics to, None to not export metrics.
+        """
+        self.interval = interval
+        self.stream = stream
+        self.metrics_file = metrics_file
+        self.total: Optional[int] = None
+        self.listed = 0
+        self.files = 0
+        self.bytes = 0
+        self.errors = 0
+        self.start_time = time.time()
+        self._last_report = (time.monotonic(), 0, 0)
+        self._last_progress = ((0, 0), self.start_time)
+        self._rates = (0.0, 0.0)
+        self._running = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'ScanProgress':
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Starts reporting thread.
+        :return: None
+        """
+        self.start_time = time.time()
+        self._last_report = (time.monotonic(), self.files, self.bytes)
+        self._last_progress = ((self.listed, self.files), self.start_time)
+        self._running = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='imgshape-progress', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops reporting thread and reports final progress.
+        :return: None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._running = False
+        self.report()
+        if self.stream is not None:
+            self.stream.write('\n')
+            self.stream.flush()
+
+    def _run(self) -> None:
+        """
+        Reports progress until stopped.
+        :return: None
+        """
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def _update(self) -> None:
+        """
+        Updates rates and time of the last progress. Listing files counts as progress too.
+        :return: None
+        """
+        now = time.monotonic()
+        listed, files, size = self.listed, self.files, self.bytes
+        last_time, last_files, last_bytes = self._last_report
+        if now > last_time:
+            self._rates = ((files - last_files) / (now - last_time), (size - last_bytes) / (now - last_time))
+        self._last_report = (now, files, size)
+        if (listed, files) != self._last_progress[0]:
+            self._last_progress = ((listed, files), time.time())
+
+    def format(self) -> str:
+        """
+        Prepares progress line.
+        :return: Progress line.
+        """
+        if self.total is None:
+            return f'Listing files... {self.listed} files, errors: {self.errors}'
+        files_rate, bytes_rate = self._rates
+        elapsed = time.time() - self.start_time
+        average = self.files / elapsed if elapsed > 0 else 0
+        eta = _format_duration((self.total - self.files) / average) if average > 0 else '?'
+        return (f'{self.files}/{self.total} files, {files_rate:.1f} files/s, {_format_size(bytes_rate)}/s, '
+                f'ETA {eta}, errors: {self.errors}')
+
+    def metrics(self) -> str:
+        """
+        Prepares metrics in Prometheus text exposition format.
+        :return: Metrics.
+        """
+        values = {'listed': self.listed,
+                  'files': self.files,
+                  'bytes': self.bytes,
+                  'errors': self.errors,
+                  'files_rate': self._rates[0],
+                  'bytes_rate': self._rates[1],
+                  'start_time': self.start_time,
+                  'last_progress_time': self._last_progress[1],
+                  'running': int(self._running)}
+        lines = []
+        for name, kind, description, key in _METRICS:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {values[key]}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self) -> None:
+        """
+        Prints progress and exports metrics. Metrics file is replaced atomically, so it can be read at any time.
+        :return: None
+        """
+        self._update()
+        if self.stream is not None:
+            self.stream.write(f'\r{self.format()}\033[K')
+            self.stream.flush()
+        if self.metrics_file is not None:
+            tmp_path = f'{self.metrics_file}.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(self.metrics())
+                os.replace(tmp_path, self.metrics_file)
+            except OSError:
+                pass
@@ -0,0 +1,104 @@
+import os
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+_FS_IOC_FIEMAP = 0xC020660B
+_FIEMAP = struct.Struct('=QQIIII')  # fm_start, fm_length, fm_flags, fm_mapped_extents, fm_extent_count, fm_reserved
+_FIEMAP_EXTENT = struct.Struct('=QQQQQIIII')  # fe_logical, fe_physical, fe_length, reserved, fe_flags, reserved
+_IO_ORDERS = ('inode', 'extent')
+
+
+def _physical_offset(path: str) -> Optional[int]:
+    """
+    Reads physical offset of the first extent of a file using FIEMAP ioctl (Linux).
+    :param path: Path to file.
+    :return: Physical offset in bytes, or None if it is not available.
+    """
+    if fcntl is None:
+        return None
+    buffer = bytearray(_FIEMAP.size + _FIEMAP_EXTENT.size)
+    _FIEMAP.pack_into(buffer, 0, 0, 0xFFFFFFFFFFFFFFFF, 0, 0, 1, 0)
+    try:
+        with open(path, 'rb') as f:
+            fcntl.ioctl(f.fileno(), _FS_IOC_FIEMAP, buffer)
+    except OSError:
+        return None
+    if _FIEMAP.unpack_from(buffer)[3] == 0:  # No mapped extents (empty or inline file)
+        return None
+    return _FIEMAP_EXTENT.unpack_from(buffer, _FIEMAP.size)[1]
+
+
+def _disk_position(path: str, order: str) -> Tuple[int, int, int]:
+    """
+    Calculates sort key approximating position of a file on disk.
+    :param path: Path to file.
+    :param order: "inode" to sort by (st_dev, st_ino), "extent" to sort by physical offset where available.
+    :return: Sort key.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 1 << 64, 0, 0
+    if order == 'extent':
+        offset = _physical_offset(path)
+        if offset is not None:
+            return st.st_dev, 0, offset
+    return st.st_dev, 1, st.st_ino
+
+
+def _advise_readahead(paths: List[str], size: int) -> None:
+    """
+    Asks the kernel to start reading beginnings of files in background.
+    :param paths: Paths to files.
+    :param size: Number of bytes to read ahead from the beginning of each file.
+    :return: None
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def disk_order(files: List[str],
+               order: str = 'inode',
+               batch_size: int = 1024,
+               readahead: int = 65536) -> Iterator[str]:
+    """
+    Reorders files to read them close to their order on disk. Files are split into batches and each batch is sorted
+    by disk position. Readahead of the next batch is requested before files of the current batch are returned, so
+    the next batch is read by the kernel while the current one is parsed.
+    :param files: List of file paths.
+    :param order: "inode" to sort by (st_dev, st_ino), "extent" to sort by physical offset where available.
+    :param batch_size: Number of files in one batch.
+    :param readahead: Number of bytes to read ahead from the beginning of each file.
+    :return: Iterator of file paths.
+    """
+    if order not in _IO_ORDERS:
+        raise ValueError(f'Invalid I/O order "{order}", expected one of: {", ".join(_IO_ORDERS)}.')
+    if batch_size < 1:
+        raise ValueError(f'Batch size must be positive, got {batch_size}.')
+
+    def prepare(start: int) -> List[str]:
+        batch = sorted(files[start:start + batch_size], key=lambda path: _disk_position(path, order))
+        _advise_readahead(batch, readahead)
+        return batch
+
+    current = prepare(0)
+    for start in range(0, len(files), batch_size):
+        following = prepare(start + batch_size) if start + batch_size < len(files) else []
+        yield from current
+        current = following
@@ -0,0 +1,188 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+from imgshape.histogram import ShapeHistogram
+
+_SNAPSHOT_VERSION = 1
+
+
+class DirectorySnapshot:
+    """
+    Snapshot of scanned directories. For every directory it keeps its signature, list of subdirectories and shapes
+    of images found directly in it (histogram per group), so unchanged directories do not have to be listed and
+    probed again.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 recursive: bool = False,
+                 follow_symlinks: bool = True,
+                 group_by: Optional[str] = None,
+                 archives: bool = False) -> None:
+        """
+        :param directory: Input directory of the scan.
+        :param recursive: True if images are searched in subdirectories.
+        :param follow_symlinks: True if images are searched in directories pointed to by symbolic links.
+        :param group_by: Group specification used to collect shapes.
+        :param archives: True if images are searched inside archives.
+        """
+        self.options = {'directory': os.path.abspath(directory),
+                        'recursive': recursive,
+                        'follow_symlinks': follow_symlinks,
+                        'group_by': group_by,
+                        'archives': archives}
+        self.directories: Dict[str, dict] = {}
+        self.previous: Dict[str, dict] = {}
+        self.reused: List[str] = []
+        self.pending: Dict[str, int] = {}
+
+    @staticmethod
+    def signature(directory: str) -> Tuple[int, int, int]:
+        """
+        Calculates directory signature. Directory modification time changes when entries are created, removed or
+        renamed. Link count is used as the entry count available without listing the directory (it counts
+        subdirectories on most POSIX file systems).
+        :param directory: Path to directory.
+        :return: Directory signature (st_mtime_ns, st_ino, st_nlink).
+        """
+        st = os.stat(directory)
+        return st.st_mtime_ns, st.st_ino, st.st_nlink
+
+    @classmethod
+    def load(cls,
+             path: str,
+             directory: str,
+             recursive: bool = False,
+             follow_symlinks: bool = True,
+             group_by: Optional[str] = None,
+             archives: bool = False) -> 'DirectorySnapshot':
+        """
+        Loads snapshot saved by previous scan. Snapshot of a scan with different options is ignored.
+        :param path: Path to snapshot file.
+        :param directory: Input directory of the scan.
+        :param recursive: True if images are searched in subdirectories.
+        :param follow_symlinks: True if images are searched in directories pointed to by symbolic links.
+        :param group_by: Group specification used to collect shapes.
+        :param archives: True if images are searched inside archives.
+        :return: Snapshot with directories of previous scan available for reuse.
+        """
+        snapshot = cls(directory, recursive=recursive, follow_symlinks=follow_symlinks, group_by=group_by,
+                       archives=archives)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return snapshot
+        if data.get('version') == _SNAPSHOT_VERSION and data.get('options') == snapshot.options:
+            snapshot.previous = data.get('directories', {})
+        return snapshot
+
+    def save(self, path: str, complete_only: bool = False) -> None:
+        """
+        Saves snapshot atomically.
+        :param path: Path to snapshot file.
+        :param complete_only: True if only directories whose all files were probed have to be saved. Used for
+        checkpoints of unfinished scans, skipped directories are listed and probed again on resume.
+        :return: None
+        """
+        directories = {directory: {'signature': record['signature'],
+                                   'subdirs': record['subdirs'],
+                                   'shapes': [[group, width, height, count]
+                                              for group, histogram in record['shapes'].items()
+                                              for (width, height), count in histogram.items()]}
+                       for directory, record in self.directories.items()
+                       if not complete_only or self.pending.get(directory, 0) == 0}
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': _SNAPSHOT_VERSION, 'options': self.options, 'directories': directories}, f)
+        os.replace(tmp_path, path)
+
+    def reuse(self, directory: str, signature: Tuple[int, int, int]) -> Optional[List[str]]:
+        """
+        Reuses directory from previous scan if its signature did not change.
+        :param directory: Path to directory.
+        :param signature: Current directory signature.
+        :return: List of subdirectories if directory was reused, None if it has to be listed again.
+        """
+        record = self.previous.get(directory)
+        if record is None or tuple(record['signature']) != tuple(signature):
+            return None
+        self.directories[directory] = {'signature': record['signature'],
+                                       'subdirs': record['subdirs'],
+                                       'shapes': self._histograms(record['shapes'])}
+        self.reused.append(directory)
+        return record['subdirs']
+
+    def record(self, directory: str, signature: Tuple[int, int, int], subdirs: List[str]) -> None:
+        """
+        Records listed directory. Its shapes are collected with add method.
+        :param directory: Path to directory.
+        :param signature: Directory signature.
+        :param subdirs: List of subdirectories.
+        :return: None
+        """
+        self.directories[directory] = {'signature': list(signature), 'subdirs': subdirs, 'shapes': {}}
+
+    def expect(self, files: List[str]) -> None:
+        """
+        Marks listed files as not probed yet.
+        :param files: Paths to files.
+        :return: None
+        """
+        for file in files:
+            directory = os.path.dirname(file)
+            self.pending[directory] = self.pending.get(directory, 0) + 1
+
+    def done(self, file: str) -> None:
+        """
+        Marks file as probed. Directory is complete when all its listed files are probed.
+        :param file: Path to file.
+        :return: None
+        """
+        directory = os.path.dirname(file)
+        self.pending[directory] -= 1
+
+    def add(self, directory: str, group: Optional[str], shape: Tuple[int, int]) -> None:
+        """
+        Adds shape of image found in directory.
+        :param directory: Path to directory containing the image.
+        :param group: Group of the image, None if images are not grouped.
+        :param shape: Image shape.
+        :return: None
+        """
+        shapes = self.directories[directory]['shapes']
+        histogram = shapes.get(group)
+        if histogram is None:
+            histogram = shapes[group] = ShapeHistogram()
+        histogram.add(shape)
+
+    def shapes(self, directories: Optional[List[str]] = None) -> Union[ShapeHistogram, Dict[str, ShapeHistogram]]:
+        """
+        Sums shapes of directories.
+        :param directories: Directories to sum, all directories of the snapshot if None.
+        :return: Histogram of image shapes, or dictionary with histogram per group if images are grouped.
+        """
+        histograms = {}
+        for directory in (self.directories if directories is None else directories):
+            for group, histogram in self.directories[directory]['shapes'].items():
+                histograms.setdefault(group, []).append(histogram)
+        if self.options['group_by'] is None:
+            return ShapeHistogram.from_histograms(histograms.get(None, []))
+        return {group: ShapeHistogram.from_histograms(group_histograms)
+                for group, group_histograms in histograms.items()}
+
+    @staticmethod
+    def _histograms(rows: List[list]) -> Dict[Optional[str], ShapeHistogram]:
+        """
+        Converts saved shapes of a directory to histograms.
+        :param rows: Saved shapes in format [group, width, height, count].
+        :return: Dictionary with histogram per group (None if images are not grouped).
+        """
+        columns = {}
+        for group, width, height, count in rows:
+            widths, heights, counts = columns.setdefault(group, ([], [], []))
+            widths.append(width)
+            heights.append(height)
+            counts.append(count)
+        return {group: ShapeHistogram.from_arrays(*column) for group, column in columns.items()}
@@ -0,0 +1,295 @@
+import math
+import random
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_COMPACTOR_DECAY = 2 / 3
+_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+_ASPECT_RATIOS = (('1:4', 1 / 4), ('1:3', 1 / 3), ('1:2', 1 / 2), ('9:16', 9 / 16), ('2:3', 2 / 3), ('3:4', 3 / 4),
+                  ('1:1', 1.0), ('4:3', 4 / 3), ('3:2', 3 / 2), ('16:9', 16 / 9), ('2:1', 2.0), ('3:1', 3.0),
+                  ('4:1', 4.0))
+_MEGAPIXEL_EDGES = (0.1, 0.3, 1, 2, 5, 12, 24, 50)
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch. Keeps a bounded number of samples (about 3 * k regardless of the number of added values)
+    and answers quantile queries with rank error of about 1 / k. Sketches can be merged.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None) -> None:
+        """
+        :param k: Accuracy parameter, bigger values give more accurate quantiles at the cost of memory.
+        :param seed: Seed of the random generator used for compaction.
+        """
+        if k < 2:
+            raise ValueError(f'Sketch accuracy parameter must be at least 2, got {k}.')
+        self.k = k
+        self.count = 0
+        self._random = random.Random(seed)
+        self._compactors: List[List[float]] = []
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def __len__(self) -> int:
+        """
+        :return: Number of samples kept in the sketch.
+        """
+        return self._size
+
+    def _capacity(self, level: int) -> int:
+        """
+        Calculates capacity of the compactor on given level. Higher levels have bigger capacity.
+        :param level: Compactor level.
+        :return: Capacity of the compactor.
+        """
+        return int(math.ceil(self.k * _COMPACTOR_DECAY ** (len(self._compactors) - level - 1))) + 1
+
+    def _grow(self) -> None:
+        """
+        Adds new compactor level.
+        :return: None
+        """
+        self._compactors.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self._compactors)))
+
+    def _compress(self) -> None:
+        """
+        Compacts full compactors, promoting every second sorted sample to the next level, until samples fit in the
+        sketch.
+        :return: None
+        """
+        while self._size >= self._max_size:
+            for level in range(len(self._compactors)):
+                compactor = self._compactors[level]
+                if len(compactor) < self._capacity(level):
+                    continue
+                if level + 1 >= len(self._compactors):
+                    self._grow()
+                compactor.sort()
+                odd = len(compactor) % 2
+                promoted = compactor[odd + int(self._random.random() < 0.5)::2]
+                self._compactors[level] = compactor[:odd]
+                self._compactors[level + 1].extend(promoted)
+                self._size = sum(len(c) for c in self._compactors)
+                if self._size < self._max_size:
+                    break
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """
+        Adds value to the sketch.
+        :param value: Value to add.
+        :param weight: Number of occurrences of the value.
+        :return: None
+        """
+        if weight < 1:
+            raise ValueError(f'Weight must be positive, got {weight}.')
+        self.count += weight
+        level = 0
+        while weight:  # Sample on level N represents 2^N values
+            if weight & 1:
+                while level >= len(self._compactors):
+                    self._grow()
+                self._compactors[level].append(value)
+                self._size += 1
+            weight >>= 1
+            level += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Merges other sketch into this one.
+        :param other: Sketch to merge.
+        :return: None
+        """
+        while len(self._compactors) < len(other._compactors):
+            self._grow()
+        for level, compactor in enumerate(other._compactors):
+            self._compactors[level].extend(compactor)
+        self.count += other.count
+        self._size = sum(len(c) for c in self._compactors)
+        self._compress()
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """
+        Calculates approximate quantiles of added values.
+        :param qs: Quantiles to calculate, values from 0 to 1.
+        :return: List of quantile values, None values if sketch is empty.
+        """
+        qs = list(qs)
+        if self.count == 0:
+            return [None for _ in qs]
+        samples = sorted((value, 1 << level) for level, compactor in enumerate(self._compactors)
+                         for value in compactor)
+        total = sum(weight for _, weight in samples)
+        result = []
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError(f'Quantile must be between 0 and 1, got {q}.')
+            rank = q * total
+            cumulative = 0
+            value = samples[-1][0]
+            for sample, weight in samples:
+                cumulative += weight
+                if cumulative >= rank:
+                    value = sample
+                    break
+            result.append(value)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Calculates approximate quantile of added values.
+        :param q: Quantile to calculate, value from 0 to 1.
+        :return: Quantile value, None if sketch is empty.
+        """
+        return self.quantiles([q])[0]
+
+
+def _aspect_ratio_bucket(width: int, height: int) -> str:
+    """
+    Finds the nearest common aspect ratio of the shape.
+    :param width: Image width.
+    :param height: Image height.
+    :return: Aspect ratio bucket name.
+    """
+    if width <= 0 or height <= 0:
+        return 'invalid'
+    ratio = math.log(width / height)
+    if ratio < math.log(_ASPECT_RATIOS[0][1]) - 0.2:
+        return f'<{_ASPECT_RATIOS[0][0]}'
+    if ratio > math.log(_ASPECT_RATIOS[-1][1]) + 0.2:
+        return f'>{_ASPECT_RATIOS[-1][0]}'
+    return min(_ASPECT_RATIOS, key=lambda x: abs(math.log(x[1]) - ratio))[0]
+
+
+def _megapixel_bucket(megapixels: float) -> str:
+    """
+    Finds megapixel range of the image area.
+    :param megapixels: Image area in megapixels.
+    :return: Megapixel bucket name.
+    """
+    lower = None
+    for edge in _MEGAPIXEL_EDGES:
+        if megapixels < edge:
+            return f'<{edge} MP' if lower is None else f'{lower}-{edge} MP'
+        lower = edge
+    return f'>={lower} MP'
+
+
+class ShapeStats:
+    """
+    Streaming summary statistics of image shapes: exact minimum and maximum, approximate quantiles of width, height
+    and megapixels and aspect ratio and megapixel distributions. Memory usage does not depend on the number of images.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None) -> None:
+        """
+        :param k: Accuracy parameter of quantile sketches.
+        :param seed: Seed of the random generator used by quantile sketches.
+        """
+        self.count = 0
+        self.minimum: Dict[str, Optional[float]] = {'width': None, 'height': None, 'megapixels': None}
+        self.maximum: Dict[str, Optional[float]] = {'width': None, 'height': None, 'megapixels': None}
+        self.sketches = {name: QuantileSketch(k=k, seed=seed) for name in self.minimum}
+        self.aspect_ratios: Dict[str, int] = {}
+        self.megapixel_ranges: Dict[str, int] = {}
+
+    def add(self, width: int, height: int, count: int = 1) -> None:
+        """
+        Adds image shape to statistics.
+        :param width: Image width.
+        :param height: Image height.
+        :param count: Number of images with this shape.
+        :return: None
+        """
+        megapixels = width * height / 1e6
+        self.count += count
+        for name, value in (('width', width), ('height', height), ('megapixels', megapixels)):
+            if self.minimum[name] is None or value < self.minimum[name]:
+                self.minimum[name] = value
+            if self.maximum[name] is None or value > self.maximum[name]:
+                self.maximum[name] = value
+            self.sketches[name].add(value, count)
+        bucket = _aspect_ratio_bucket(width, height)
+        self.aspect_ratios[bucket] = self.aspect_ratios.get(bucket, 0) + count
+        bucket = _megapixel_bucket(megapixels)
+        self.megapixel_ranges[bucket] = self.megapixel_ranges.get(bucket, 0) + count
+
+    def add_shapes(self, shapes: Mapping) -> None:
+        """
+        Adds shapes with their counts to statistics.
+        :param shapes: Dictionary with image shapes or dictionary with image shapes per group.
+        :return: None
+        """
+        for key, value in shapes.items():
+            if isinstance(value, Mapping):
+                self.add_shapes(value)
+            else:
+                self.add(*key, count=value)
+
+    def merge(self, other: 'ShapeStats') -> None:
+        """
+        Merges statistics collected by other worker or from other shard into this one.
+        :param other: Statistics to merge.
+        :return: None
+        """
+        self.count += other.count
+        for name in self.minimum:
+            if other.minimum[name] is not None and (self.minimum[name] is None
+                                                    or other.minimum[name] < self.minimum[name]):
+                self.minimum[name] = other.minimum[name]
+            if other.maximum[name] is not None and (self.maximum[name] is None
+                                                    or other.maximum[name] > self.maximum[name]):
+                self.maximum[name] = other.maximum[name]
+            self.sketches[name].merge(other.sketches[name])
+        for bucket, count in other.aspect_ratios.items():
+            self.aspect_ratios[bucket] = self.aspect_ratios.get(bucket, 0) + count
+        for bucket, count in other.megapixel_ranges.items():
+            self.megapixel_ranges[bucket] = self.megapixel_ranges.get(bucket, 0) + count
+
+    def to_dict(self, quantiles: Tuple[float, ...] = _QUANTILES) -> dict:
+        """
+        Prepares statistics in form ready to be serialized as JSON.
+        :param quantiles: Quantiles to report.
+        :return: Dictionary with statistics.
+        """
+        return {
+            'count': self.count,
+            'min': dict(self.minimum),
+            'max': dict(self.maximum),
+            'quantiles': {name: {str(q): value for q, value in zip(quantiles, sketch.quantiles(quantiles))}
+                          for name, sketch in self.sketches.items()},
+            'aspect_ratios': dict(sorted(self.aspect_ratios.items(), key=lambda x: -x[1])),
+            'megapixels': dict(sorted(self.megapixel_ranges.items(), key=lambda x: -x[1])),
+        }
+
+    def format_text(self, quantiles: Tuple[float, ...] = _QUANTILES) -> str:
+        """
+        Prepares human-readable statistics.
+        :param quantiles: Quantiles to report.
+        :return: Statistics as text.
+        """
+        data = self.to_dict(quantiles)
+        lines = [f'Images: {data["count"]}']
+        if data['count'] == 0:
+            return lines[0]
+        for name in self.minimum:
+            values = ', '.join(f'p{q * 100:g}={_format_number(v)}' for q, v in zip(quantiles,
+                                                                                   data['quantiles'][name].values()))
+            lines.append(f'{name.capitalize()}: min={_format_number(data["min"][name])}, '
+                         f'max={_format_number(data["max"][name])}, {values}')
+        lines.append('Aspect ratios: ' + ', '.join(f'{k}: {v}' for k, v in data['aspect_ratios'].items()))
+        lines.append('Megapixel ranges: ' + ', '.join(f'{k}: {v}' for k, v in data['megapixels'].items()))
+        return '\n'.join(lines)
+
+
+def _format_number(value: float) -> str:
+    """
+    Formats number for text statistics.
+    :param value: Number to format.
+    :return: Formatted number.
+    """
+    return f'{value:g}' if isinstance(value, float) else str(value)
@@ -0,0 +1,480 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from matplotlib import pyplot as plt
+
+from imgshape.histogram import ShapeHistogram
+from imgshape.imgshape import _is_image, _parse_group_by, _read_shape, _save_shapes, plot_shapes
+from imgshape.snapshot import DirectorySnapshot
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_IN_EVENT = struct.Struct('iIII')
+
+Change = Tuple[str, str]  # ('update' | 'remove' | 'remove_dir', path)
+
+
+class ShapeIndex:
+    """
+    Shapes of images kept up to date with created, modified and deleted files.
+    """
+
+    def __init__(self, directory: str, group_by: Optional[str] = None) -> None:
+        """
+        :param directory: Watched directory.
+        :param group_by: Group specification ("depth=N" or "regex=PATTERN") to collect shapes per group.
+        """
+        self.directory = os.path.abspath(directory)
+        self.files: Dict[str, Tuple[Optional[str], Tuple[int, int]]] = {}
+        self._group_of = _parse_group_by(group_by) if group_by is not None else None
+        self._shapes = ShapeHistogram() if self._group_of is None else {}
+
+    @property
+    def shapes(self) -> Union[ShapeHistogram, Dict[str, ShapeHistogram]]:
+        """
+        :return: Histogram of image shapes, or dictionary with histogram per group if images are grouped. Groups
+        without images are left out.
+        """
+        if self._group_of is not None:
+            for group in [group for group, histogram in self._shapes.items() if not histogram]:
+                del self._shapes[group]
+        return self._shapes
+
+    def _count(self, group: Optional[str], shape: Tuple[int, int], delta: int) -> None:
+        """
+        Changes number of images with given shape.
+        :param group: Group of images, None if images are not grouped.
+        :param shape: Image shape.
+        :param delta: Change of images count.
+        :return: None
+        """
+        target = self._shapes if group is None else self._shapes.get(group)
+        if target is None:
+            target = self._shapes[group] = ShapeHistogram()
+        target.add(shape, delta)
+
+    def update(self, path: str) -> bool:
+        """
+        Probes created or modified file.
+        :param path: Path to file.
+        :return: True if shapes changed.
+        """
+        shape = _read_shape(path) if _is_image(path) else None
+        changed = self.remove(path)
+        if shape is None:
+            return changed
+        group = self._group_of(os.path.relpath(path, self.directory)) if self._group_of is not None else None
+        self.files[path] = (group, shape)
+        self._count(group, shape, 1)
+        return True
+
+    def remove(self, path: str) -> bool:
+        """
+        Forgets deleted file.
+        :param path: Path to file.
+        :return: True if shapes changed.
+        """
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return False
+        self._count(*entry, -1)
+        return True
+
+    def remove_dir(self, path: str) -> bool:
+        """
+        Forgets all files in deleted directory.
+        :param path: Path to directory.
+        :return: True if shapes changed.
+        """
+        prefix = path.rstrip(os.sep) + os.sep
+        removed = [file for file in self.files if file.startswith(prefix)]
+        for file in removed:
+            self.remove(file)
+        return bool(removed)
+
+    def apply(self, changes: List[Change]) -> bool:
+        """
+        Applies changes reported by the watcher.
+        :param changes: List of changes.
+        :return: True if shapes changed.
+        """
+        changed = False
+        for kind, path in changes:
+            if kind == 'update':
+                changed = self.update(path) or changed
+            elif kind == 'remove':
+                changed = self.remove(path) or changed
+            else:
+                changed = self.remove_dir(path) or changed
+        return changed
+
+
+def _list_directory(directory: str, recursive: bool, follow_symlinks: bool) -> Tuple[List[str], List[str]]:
+    """
+    Lists files and subdirectories of a directory.
+    :param directory: Directory to list.
+    :param recursive: True if subdirectories have to be returned.
+    :param follow_symlinks: True if directories pointed to by symbolic links have to be returned.
+    :return: List of files and list of subdirectories.
+    """
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if recursive and (follow_symlinks or not entry.is_symlink()):
+                    subdirs.append(entry.path)
+            elif entry.is_file():
+                files.append(entry.path)
+    return files, subdirs
+
+
+class PollingWatcher:
+    """
+    Watcher which periodically compares directories with their previous state. Only directories with changed
+    signature are listed, so files modified in place are not detected.
+    """
+
+    def __init__(self, directory: str, recursive: bool = False, follow_symlinks: bool = True,
+                 interval: float = 5.0) -> None:
+        """
+        :param directory: Directory to watch.
+        :param recursive: True if subdirectories have to be watched.
+        :param follow_symlinks: True if directories pointed to by symbolic links have to be watched.
+        :param interval: Time between polls in seconds.
+        """
+        self.directory = os.path.abspath(directory)
+        self.recursive = recursive
+        self.follow_symlinks = follow_symlinks
+        self.interval = interval
+        self._directories: Dict[str, Tuple[Tuple[int, int, int], List[str], Dict[str, Tuple[int, int]]]] = {}
+        self._unsettled = set()
+        self._next_poll = 0.0
+
+    def scan(self) -> List[Change]:
+        """
+        Compares directories with their previous state. Files modified recently are checked on every scan until they
+        stop changing, so files still being written when their directory was listed are probed again.
+        :return: List of changes. First scan reports all files as updated.
+        """
+        changes = []
+        for file in list(self._unsettled):
+            record = self._directories.get(os.path.dirname(file))
+            try:
+                st = os.stat(file)
+            except OSError:
+                self._unsettled.discard(file)
+                continue
+            if record is not None and file in record[2] and record[2][file] != (st.st_mtime_ns, st.st_size):
+                record[2][file] = (st.st_mtime_ns, st.st_size)
+                changes.append(('update', file))
+            elif time.time_ns() - st.st_mtime_ns > self.interval * 2e9:
+                self._unsettled.discard(file)
+        seen = set()
+        pending = [self.directory]
+        while pending:
+            current = pending.pop()
+            try:
+                signature = DirectorySnapshot.signature(current)
+                seen.add(current)
+                previous = self._directories.get(current)
+                if previous is not None and previous[0] == signature:
+                    pending.extend(previous[1])
+                    continue
+                files, subdirs = _list_directory(current, self.recursive, self.follow_symlinks)
+                stats = {}
+                for file in files:
+                    try:
+                        st = os.stat(file)
+                    except OSError:
+                        continue
+                    stats[file] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+            previous_stats = previous[2] if previous is not None else {}
+            for file, st in stats.items():
+                if previous_stats.get(file) != st:
+                    changes.append(('update', file))
+                    if time.time_ns() - st[0] <= self.interval * 2e9:
+                        self._unsettled.add(file)
+            changes.extend(('remove', file) for file in previous_stats if file not in stats)
+            self._directories[current] = (signature, subdirs, stats)
+            pending.extend(subdirs)
+        for directory in [directory for directory in self._directories if directory not in seen]:
+            changes.extend(('remove', file) for file in self._directories.pop(directory)[2])
+        self._next_poll = time.monotonic() + self.interval
+        return changes
+
+    def changes(self, timeout: float) -> List[Change]:
+        """
+        Waits for the next poll.
+        :param timeout: Maximum time to wait in seconds.
+        :return: List of changes, empty if poll was not due within timeout.
+        """
+        delay = self._next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        if delay > 0:
+            time.sleep(delay)
+        return self.scan()
+
+    def close(self) -> None:
+        """
+        Releases watcher resources.
+        :return: None
+        """
+
+
+class InotifyWatcher:
+    """
+    Watcher receiving file system events from Linux inotify.
+    """
+
+    def __init__(self, directory: str, recursive: bool = False, follow_symlinks: bool = True) -> None:
+        """
+        :param directory: Directory to watch.
+        :param recursive: True if subdirectories have to be watched.
+        :param follow_symlinks: True if directories pointed to by symbolic links have to be watched.
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is available only on Linux.')
+        self.directory = os.path.abspath(directory)
+        self.recursive = recursive
+        self.follow_symlinks = follow_symlinks
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._watches: Dict[int, str] = {}
+
+    def _add_watch(self, directory: str) -> None:
+        """
+        Adds watch for a directory. Directory which can not be watched (e.g. it is not readable or was already
+        removed) is skipped.
+        :param directory: Directory to watch.
+        :return: None
+        :raises OSError: If the limit of inotify watches (fs.inotify.max_user_watches) or kernel memory is exhausted.
+        """
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = directory
+            return
+        error = ctypes.get_errno()
+        if error in (errno.ENOSPC, errno.ENOMEM):
+            raise OSError(error, f'Can not watch directory "{directory}": {os.strerror(error)} (inotify watches '
+                                 f'limit fs.inotify.max_user_watches reached)')
+
+    def _add_tree(self, directory: str) -> List[Change]:
+        """
+        Adds watches for directory and its subdirectories. Directories which can not be watched are still listed.
+        :param directory: Directory to watch.
+        :return: List of changes reporting all files in the directory as updated.
+        :raises OSError: If the limit of inotify watches is reached.
+        """
+        changes = []
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            self._add_watch(current)
+            try:
+                files, subdirs = _list_directory(current, self.recursive, self.follow_symlinks)
+            except OSError:
+                continue
+            changes.extend(('update', file) for file in files)
+            pending.extend(subdirs)
+        return changes
+
+    def scan(self) -> List[Change]:
+        """
+        Adds watches for all directories. Watches are added before listing, so no file is missed.
+        :return: List of changes reporting all files as updated.
+        """
+        for wd in list(self._watches):
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._watches.clear()
+        return self._add_tree(self.directory)
+
+    def changes(self, timeout: float) -> List[Change]:
+        """
+        Waits for file system events.
+        :param timeout: Maximum time to wait in seconds.
+        :return: List of changes.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        changes = []
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _IN_EVENT.unpack_from(data, offset)
+                name = data[offset + _IN_EVENT.size:offset + _IN_EVENT.size + length].rstrip(b'\0')
+                offset += _IN_EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:  # Events were lost, all directories must be compared again
+                    return [('remove_dir', self.directory)] + self.scan()
+                if mask & _IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO) and self.recursive:
+                        changes.extend(self._add_tree(path))
+                    elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                        changes.append(('remove_dir', path))
+                elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                    changes.append(('update', path))
+                elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    changes.append(('remove', path))
+        return changes
+
+    def close(self) -> None:
+        """
+        Releases watcher resources.
+        :return: None
+        """
+        os.close(self._fd)
+
+
+def _flush(shapes: dict,
+           save_file: Optional[str],
+           plot: bool,
+           layout: str,
+           handler: Optional[int] = None) -> Optional[int]:
+    """
+    Saves shapes atomically and refreshes the plot.
+    :param shapes: Dictionary with image shapes or dictionary with image shapes per group.
+    :param save_file: Path to file to save list of shapes.
+    :param plot: True if plot has to be refreshed.
+    :param layout: Layout of grouped shapes plot ("overlay" or "facet").
+    :param handler: Connection id of the hover handler of the previous plot, disconnected before redrawing.
+    :return: Connection id of the hover handler of the new plot, None if nothing was plotted.
+    """
+    if save_file is not None:
+        tmp_path = f'{save_file}.tmp'
+        open(tmp_path, 'w').close()
+        _save_shapes(tmp_path, shapes)
+        os.replace(tmp_path, save_file)
+    if not plot:
+        return None
+    if handler is not None:
+        plt.gcf().canvas.mpl_disconnect(handler)
+        handler = None
+    plt.clf()
+    if shapes:
+        handler = plot_shapes(shapes, layout=layout, show=False)
+    plt.pause(0.001)
+    return handler
+
+
+def _fall_back_to_polling(watcher: InotifyWatcher, error: OSError, poll_interval: float) -> PollingWatcher:
+    """
+    Replaces inotify watcher which failed (e.g. reached the limit of watches) with polling watcher.
+    :param watcher: Failed watcher.
+    :param error: Error of the watcher.
+    :param poll_interval: Time between polls in seconds.
+    :return: Polling watcher of the same directory.
+    """
+    print(f'Warning: {error}. Falling back to polling.', file=sys.stderr)
+    watcher.close()
+    return PollingWatcher(watcher.directory, recursive=watcher.recursive, follow_symlinks=watcher.follow_symlinks,
+                          interval=poll_interval)
+
+
+def watch_shapes(directory: str,
+                 recursive: bool = False,
+                 follow_symlinks: bool = True,
+                 group_by: Optional[str] = None,
+                 save_file: Optional[str] = None,
+                 flush_interval: float = 10.0,
+                 poll_interval: float = 5.0,
+                 polling: bool = False,
+                 plot: bool = False,
+                 layout: str = 'overlay',
+                 stop: Optional[threading.Event] = None) -> Union[ShapeHistogram, Dict[str, ShapeHistogram]]:
+    """
+    Scans directory once and then keeps shapes up to date by probing only created or modified files. Shapes are
+    periodically saved and plotted.
+    :param directory: Directory to watch.
+    :param recursive: True if images must be searched in subdirectories.
+    :param follow_symlinks: True if images must be searched in directories pointed to by symbolic links.
+    :param group_by: Group specification ("depth=N" or "regex=PATTERN") to collect shapes per group.
+    :param save_file: Path to file to save list of shapes. File is overwritten on every flush.
+    :param flush_interval: Minimum time between flushes of changed shapes in seconds.
+    :param poll_interval: Time between polls in seconds if inotify is not available.
+    :param polling: True if directory has to be polled even if inotify is available. Inotify watcher which fails
+    (e.g. reaches the limit of watches) is replaced with polling.
+    :param plot: True if shapes distribution plot has to be refreshed on every flush.
+    :param layout: Layout of grouped shapes plot ("overlay" or "facet").
+    :param stop: Event which stops watching when set. Watching is also stopped by KeyboardInterrupt.
+    :return: Histogram of image shapes, or dictionary with histogram per group if images are grouped.
+    """
+    index = ShapeIndex(directory, group_by=group_by)
+    watcher = None
+    if not polling:
+        try:
+            watcher = InotifyWatcher(directory, recursive=recursive, follow_symlinks=follow_symlinks)
+        except (OSError, AttributeError):  # Not Linux or libc without inotify
+            watcher = None
+    if watcher is None:
+        watcher = PollingWatcher(directory, recursive=recursive, follow_symlinks=follow_symlinks,
+                                 interval=poll_interval)
+    if plot:
+        plt.ion()
+    handler = None
+    try:
+        try:
+            changes = watcher.scan()
+        except OSError as e:
+            if isinstance(watcher, PollingWatcher):
+                raise
+            watcher = _fall_back_to_polling(watcher, e, poll_interval)
+            changes = watcher.scan()
+        index.apply(changes)
+        handler = _flush(index.shapes, save_file, plot, layout)
+        last_flush = time.monotonic()
+        dirty = False
+        while stop is None or not stop.is_set():
+            timeout = max(0.0, min(0.5, last_flush + flush_interval - time.monotonic())) if dirty else 0.5
+            try:
+                changes = watcher.changes(timeout)
+            except OSError as e:
+                if isinstance(watcher, PollingWatcher):
+                    raise
+                watcher = _fall_back_to_polling(watcher, e, poll_interval)
+                changes = [('remove_dir', index.directory)] + watcher.scan()
+            dirty = index.apply(changes) or dirty
+            if dirty and time.monotonic() - last_flush >= flush_interval:
+                handler = _flush(index.shapes, save_file, plot, layout, handler)
+                last_flush = time.monotonic()
+                dirty = False
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    _flush(index.shapes, save_file, plot, layout, handler)
+    return index.shapes
@@ -0,0 +1,203 @@
+import io
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.abspath('./'))
+
+from imgshape.backends import HttpBackend
+from imgshape.imgshape import _get_shapes
+
+
+class _ObjectStorage(ThreadingHTTPServer):
+    """
+    Minimal S3-compatible stand-in server: ListObjectsV2 and ranged GET of objects stored in memory.
+    """
+
+    def __init__(self, objects: Dict[str, bytes], ranges: bool = True) -> None:
+        super().__init__(('127.0.0.1', 0), _ObjectStorageHandler)
+        self.objects = objects
+        self.ranges = ranges
+        self.sent_bytes = 0
+        self.list_requests = 0
+        self.clients = set()
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class _ObjectStorageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.sent_bytes += len(body)
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.clients.add(self.client_address)
+        url = urlsplit(self.path)
+        bucket, _, key = url.path.lstrip('/').partition('/')
+        if bucket != 'bucket':
+            self._send(404, b'')
+        elif not key:
+            self._list(parse_qs(url.query))
+        elif key not in self.server.objects:
+            self._send(404, b'')
+        else:
+            data = self.server.objects[key]
+            match = re.fullmatch(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+            if not self.server.ranges or match is None:
+                self._send(200, data)
+            elif int(match.group(1)) >= len(data):
+                self._send(416, b'')
+            else:
+                self._send(206, data[int(match.group(1)):int(match.group(2)) + 1])
+
+    def _list(self, query: dict) -> None:
+        with self.server.lock:
+            self.server.list_requests += 1
+        prefix = query.get('prefix', [''])[0]
+        delimiter = query.get('delimiter', [None])[0]
+        max_keys = int(query.get('max-keys', ['1000'])[0])
+        start = int(query.get('continuation-token', ['0'])[0])
+        keys = sorted(key for key in self.server.objects if key.startswith(prefix)
+                      and (delimiter is None or delimiter not in key[len(prefix):]))
+        page = keys[start:start + max_keys]
+        truncated = start + max_keys < len(keys)
+        body = '<?xml version="1.0" encoding="UTF-8"?>'
+        body += '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+        body += ''.join(f'<Contents><Key>{escape(key)}</Key></Contents>' for key in page)
+        body += f'<IsTruncated>{str(truncated).lower()}</IsTruncated>'
+        if truncated:
+            body += f'<NextContinuationToken>{start + max_keys}</NextContinuationToken>'
+        body += '</ListBucketResult>'
+        self._send(200, body.encode())
+
+
+def _image(width: int, height: int, fmt: str = 'PNG') -> bytes:
+    """
+    Creates image with random pixels.
+    :param width: Image width.
+    :param height: Image height.
+    :param fmt: Image format.
+    :return: Encoded image.
+    """
+    data = io.BytesIO()
+    Image.fromarray(np.random.randint(0, 256, (height, width, 3), dtype=np.uint8)).save(data, fmt)
+    return data.getvalue()
+
+
+class Test:
+    @staticmethod
+    def _serve(objects: Dict[str, bytes], ranges: bool = True) -> _ObjectStorage:
+        """
+        Starts stand-in object storage server in background thread.
+        :param objects: Stored objects.
+        :param ranges: True if server supports range requests.
+        :return: Running server.
+        """
+        server = _ObjectStorage(objects, ranges=ranges)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def test_http_backend_lists_with_pagination(self):
+        """
+        Tests that the backend lists all objects under prefix using multiple listing requests.
+        """
+        # Given
+        objects = {f'data/train/{i}.png': b'' for i in range(5)}
+        objects.update({'data/top.png': b'', 'other/x.png': b''})
+        server = Test._serve(objects)
+        backend = HttpBackend(server.endpoint, 'bucket', page_size=2)
+
+        # When
+        recursive = backend.list_files('data', recursive=True)
+        flat = backend.list_files('data', recursive=False)
+
+        # Then
+        assert sorted(recursive) == sorted(key for key in objects if key.startswith('data/'))
+        assert flat == ['data/top.png']
+        assert server.list_requests == 4
+
+        # Post actions
+        backend.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_get_shapes_with_http_backend_reads_only_headers(self):
+        """
+        Tests that shapes are read from objects using range requests over pooled connections, fetching only headers.
+        """
+        # Given
+        objects = {f'data/{split}/{i}.png': _image(400, 300) for split in ('train', 'val') for i in range(10)}
+        objects['data/val/exif.jpg'] = _image(320, 240, 'JPEG')
+        objects['data/val/notes.txt'] = b'not an image' * 1000
+        server = Test._serve(objects)
+        backend = HttpBackend(server.endpoint, 'bucket', workers=4)
+
+        # When
+        shapes = _get_shapes('data', recursive=True, group_by='depth=1', backend=backend)
+
+        # Then
+        assert shapes == {'train': {(400, 300): 10}, 'val': {(400, 300): 10, (320, 240): 1}}
+        assert server.sent_bytes < sum(len(data) for data in objects.values()) / 5
+        assert len(server.clients) <= 4
+
+        # Post actions
+        backend.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_get_shapes_with_http_backend_without_range_support(self):
+        """
+        Tests that shapes are read when server ignores range requests and sends whole objects.
+        """
+        # Given
+        objects = {'a.png': _image(40, 30), 'b.jpg': _image(20, 10, 'JPEG')}
+        server = Test._serve(objects, ranges=False)
+        backend = HttpBackend(server.endpoint, 'bucket', workers=2)
+
+        # When
+        shapes = _get_shapes('', recursive=True, backend=backend)
+
+        # Then
+        assert shapes == {(40, 30): 1, (20, 10): 1}
+
+        # Post actions
+        backend.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_http_backend_from_url(self):
+        """
+        Tests that the backend is created from URL of a directory and invalid URLs are rejected.
+        """
+        # When
+        backend, prefix = HttpBackend.from_url('http://localhost:9000/bucket/data/train')
+
+        # Then
+        assert backend.bucket == 'bucket'
+        assert prefix == 'data/train'
+        with pytest.raises(ValueError):
+            HttpBackend.from_url('http://localhost:9000/')
@@ -0,0 +1,107 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath('./'))
+
+from imgshape.histogram import ShapeHistogram
+
+
+class Test:
+    def test_shape_histogram_add_counts_shapes(self):
+        """
+        Tests that added shapes are counted and the histogram behaves like a dictionary of shapes.
+        """
+        # Given
+        histogram = ShapeHistogram()
+
+        # When
+        histogram.add((300, 400))
+        histogram.add((100, 200), count=2)
+        histogram.add((300, 400))
+
+        # Then
+        assert histogram == {(100, 200): 2, (300, 400): 2}
+        assert len(histogram) == 2
+        assert histogram[(100, 200)] == 2
+        assert (100, 201) not in histogram
+        assert list(histogram) == [(100, 200), (300, 400)]
+        assert histogram.total() == 4
+
+    def test_shape_histogram_add_many_and_merge(self):
+        """
+        Tests that batches of shapes and other histograms are merged with counts of equal shapes summed.
+        """
+        # Given
+        first = ShapeHistogram.from_arrays([100, 300, 100], [200, 400, 200])
+        second = ShapeHistogram({(100, 200): 5, (2 ** 32 - 1, 1): 1})
+
+        # When
+        first.merge(second)
+        first.add_many(np.array([300]), np.array([400]), np.array([10]))
+
+        # Then
+        assert first.to_dict() == {(100, 200): 7, (300, 400): 11, (2 ** 32 - 1, 1): 1}
+        assert second.to_dict() == {(100, 200): 5, (2 ** 32 - 1, 1): 1}
+
+    def test_shape_histogram_removes_zero_counts(self):
+        """
+        Tests that shapes whose count drops to zero are removed.
+        """
+        # Given
+        histogram = ShapeHistogram({(100, 200): 1, (300, 400): 2})
+
+        # When
+        histogram.add((100, 200), count=-1)
+
+        # Then
+        assert histogram == {(300, 400): 2}
+
+    def test_shape_histogram_sorted_views(self):
+        """
+        Tests views of shapes sorted by count and the most frequent shapes.
+        """
+        # Given
+        histogram = ShapeHistogram({(100, 200): 3, (300, 400): 1, (50, 60): 2})
+
+        # When
+        widths, heights, counts = histogram.by_count()
+        top = histogram.top(2)
+
+        # Then
+        assert widths.tolist() == [300, 50, 100]
+        assert heights.tolist() == [400, 60, 200]
+        assert counts.tolist() == [1, 2, 3]
+        assert top == [((100, 200), 3), ((50, 60), 2)]
+
+    def test_shape_histogram_add_many_length_mismatch(self):
+        """
+        Tests that batch with different number of shapes and counts is rejected.
+        """
+        # Given
+        histogram = ShapeHistogram()
+
+        # When / Then
+        with pytest.raises(ValueError):
+            histogram.add_many([100, 200], [100, 200], [1])
+
+    def test_shape_histogram_from_histograms(self):
+        """
+        Tests that many histograms are summed into one, including buffered shapes and no histograms at all.
+        """
+        # Given
+        first = ShapeHistogram({(100, 200): 1, (300, 400): 2})
+        second = ShapeHistogram()
+        second.add((100, 200), count=4)
+        third = ShapeHistogram({(300, 400): 1})
+        third.add((300, 400), count=-1)
+
+        # When
+        histogram = ShapeHistogram.from_histograms([first, second, third])
+
+        # Then
+        assert histogram.to_dict() == {(100, 200): 5, (300, 400): 2}
+        assert first.to_dict() == {(100, 200): 1, (300, 400): 2}
+        assert ShapeHistogram.from_histograms([]) == {}
@@ -1,14 +1,18 @@
 import os
 import sys
 
+from PIL import Image
+
 sys.path.append(os.path.abspath('./'))
 from tests import _prepare_images, _remove_test_dir
 
 from imgshape.imgshape import _get_picture_list
+from imgshape.snapshot import DirectorySnapshot
 
 
 class Test:
     __test_dir = 'test_tmp'
+    __snapshot_path = 'test_tmp_snapshot.json'
 
     def test_get_picture_list_with_directory_only_image_files_non_recursive(self):
         """
@@ -140,3 +144,53 @@ class Test:
 
         # Post actions
         _remove_test_dir(Test.__test_dir)
+
+    def test_get_picture_list_with_snapshot_skips_unchanged_directories(self):
+        """
+        Tests that the function does not list directories which did not change since the snapshot was taken.
+        """
+        # Given
+        _prepare_images(Test.__test_dir, img_num=2)
+        _prepare_images(os.path.join(Test.__test_dir, 'nested1'), img_num=2)
+        expected_images = _prepare_images(os.path.join(Test.__test_dir, 'nested1', 'deep'), img_num=2)
+        _prepare_images(os.path.join(Test.__test_dir, 'nested2'), img_num=2)
+        snapshot = DirectorySnapshot(Test.__test_dir, recursive=True)
+        _get_picture_list(Test.__test_dir, recursive=True, snapshot=snapshot)
+        snapshot.save(Test.__snapshot_path)
+        expected_images.append(os.path.abspath(os.path.join(Test.__test_dir, 'nested1', 'deep', 'new.png')))
+        Image.new('RGB', (10, 20)).save(expected_images[-1])
+
+        # When
+        snapshot = DirectorySnapshot.load(Test.__snapshot_path, Test.__test_dir, recursive=True)
+        result = _get_picture_list(Test.__test_dir, recursive=True, snapshot=snapshot)
+
+        # Then
+        assert sorted(result) == sorted(expected_images)
+        assert len(snapshot.reused) == 3
+        assert len(snapshot.directories) == 4
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+        os.remove(Test.__snapshot_path)
+
+    def test_get_picture_list_with_snapshot_of_other_options(self):
+        """
+        Tests that the function ignores snapshot taken with different options.
+        """
+        # Given
+        expected_images = _prepare_images(Test.__test_dir, img_num=2)
+        snapshot = DirectorySnapshot(Test.__test_dir, recursive=False)
+        _get_picture_list(Test.__test_dir, recursive=False, snapshot=snapshot)
+        snapshot.save(Test.__snapshot_path)
+
+        # When
+        snapshot = DirectorySnapshot.load(Test.__snapshot_path, Test.__test_dir, recursive=True)
+        result = _get_picture_list(Test.__test_dir, recursive=True, snapshot=snapshot)
+
+        # Then
+        assert sorted(result) == sorted(expected_images)
+        assert not snapshot.reused
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+        os.remove(Test.__snapshot_path)
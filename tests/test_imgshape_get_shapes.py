@@ -6,11 +6,15 @@ import pytest
 sys.path.append(os.path.abspath('./'))
 from tests import _make_dir, _prepare_images, _remove_test_dir
 
-from imgshape.imgshape import _get_shapes
+from imgshape import imgshape
+from imgshape.imgshape import _get_shapes, _save_shapes
+from imgshape.snapshot import DirectorySnapshot
+from imgshape.stats import ShapeStats
 
 
 class Test:
     __test_dir = 'test_tmp'
+    __snapshot_path = 'test_tmp_snapshot.json'
 
     @staticmethod
     def __prepare_shapes(shapes: list) -> dict:
@@ -103,3 +107,173 @@ class Test:
 
         # Post actions
         _remove_test_dir(Test.__test_dir)
+
+    def test_get_shapes_grouped_by_depth(self):
+        """
+        Tests that the function collects shapes separately for each subdirectory in one pass.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        _prepare_images(os.path.join(Test.__test_dir, 'train'), img_num=3, shape=(100, 200))
+        _prepare_images(os.path.join(Test.__test_dir, 'val'), img_num=2, shape=(300, 400))
+        _prepare_images(os.path.join(Test.__test_dir, 'val', 'nested'), img_num=1, shape=(100, 200))
+
+        # When
+        shapes = _get_shapes(Test.__test_dir, recursive=True, follow_symlinks=True, group_by='depth=1')
+
+        # Then
+        assert shapes == {'train': {(100, 200): 3}, 'val': {(300, 400): 2, (100, 200): 1}}
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_get_shapes_grouped_from_file(self):
+        """
+        Tests that the function restores saved groups when shapes are read from a file.
+        """
+        # Given
+        expected_shapes = {'train': {(100, 200): 3, (800, 600): 1}, 'val, old': {(300, 400): 2},
+                           "c'd": {(10, 20): 1}, 'a"b': {(30, 40): 5}}
+        _make_dir(Test.__test_dir)
+        file_path = os.path.join(Test.__test_dir, 'test.csv')
+        _save_shapes(file_path, expected_shapes)
+
+        # When
+        shapes = _get_shapes(read_file=file_path)
+
+        # Then
+        assert shapes == expected_shapes
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_get_shapes_updates_stats(self):
+        """
+        Tests that the function feeds statistics with shapes of all read images.
+        """
+        # Given
+        img_shapes = [(100, 200), (300, 400), (100, 200)]
+        _prepare_images(Test.__test_dir, img_num=len(img_shapes), shape=img_shapes)
+        stats = ShapeStats(seed=1)
+
+        # When
+        _get_shapes(Test.__test_dir, recursive=True, follow_symlinks=True, stats=stats)
+
+        # Then
+        assert stats.count == 3
+        assert stats.minimum['width'] == 100
+        assert stats.maximum['height'] == 400
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_get_shapes_with_snapshot_reuses_unchanged_directories(self):
+        """
+        Tests that the function combines shapes reused from snapshot with shapes of rescanned directories.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        _prepare_images(os.path.join(Test.__test_dir, 'train'), img_num=3, shape=(100, 200))
+        val_images = _prepare_images(os.path.join(Test.__test_dir, 'val'), img_num=2, shape=(300, 400))
+        snapshot = DirectorySnapshot(Test.__test_dir, recursive=True, group_by='depth=1')
+        _get_shapes(Test.__test_dir, recursive=True, group_by='depth=1', snapshot=snapshot)
+        snapshot.save(Test.__snapshot_path)
+        os.remove(val_images[0])
+        stats = ShapeStats(seed=1)
+
+        # When
+        snapshot = DirectorySnapshot.load(Test.__snapshot_path, Test.__test_dir, recursive=True, group_by='depth=1')
+        shapes = _get_shapes(Test.__test_dir, recursive=True, group_by='depth=1', stats=stats, snapshot=snapshot)
+
+        # Then
+        assert shapes == {'train': {(100, 200): 3}, 'val': {(300, 400): 1}}
+        assert stats.count == 4
+        assert sorted(snapshot.reused) == sorted([os.path.abspath(Test.__test_dir),
+                                                  os.path.abspath(os.path.join(Test.__test_dir, 'train'))])
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+        os.remove(Test.__snapshot_path)
+
+    def test_get_shapes_resumes_from_checkpoint(self, monkeypatch):
+        """
+        Tests that interrupted scan saves checkpoint with completed directories and resumed scan probes only
+        the remaining ones.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        _prepare_images(os.path.join(Test.__test_dir, 'a'), img_num=2, shape=(100, 200))
+        _prepare_images(os.path.join(Test.__test_dir, 'b'), img_num=2, shape=(100, 200))
+        probed = []
+
+        def read_shape(path, **kwargs):
+            probed.append(path)
+            if len(probed) == 4:
+                raise KeyboardInterrupt
+            return read_shape.original(path, **kwargs)
+
+        read_shape.original = imgshape._read_shape
+        monkeypatch.setattr(imgshape, '_read_shape', read_shape)
+        snapshot = DirectorySnapshot(Test.__test_dir, recursive=True)
+        with pytest.raises(KeyboardInterrupt):
+            _get_shapes(Test.__test_dir, recursive=True, snapshot=snapshot, checkpoint_file=Test.__snapshot_path)
+        completed = os.path.dirname(probed[0])
+        probed.clear()
+
+        # When
+        snapshot = DirectorySnapshot.load(Test.__snapshot_path, Test.__test_dir, recursive=True)
+        shapes = _get_shapes(Test.__test_dir, recursive=True, snapshot=snapshot, checkpoint_file=Test.__snapshot_path)
+
+        # Then
+        assert shapes == {(100, 200): 4}
+        assert completed in snapshot.reused
+        assert len(probed) == 2
+        assert all(os.path.dirname(path) != completed for path in probed)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+        os.remove(Test.__snapshot_path)
+
+    def test_get_shapes_checkpoints_files_without_images(self, monkeypatch):
+        """
+        Tests that checkpoint interval is checked after every probed file, also when the file has no image shape.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        _prepare_images(os.path.join(Test.__test_dir, 'a'), other_files_num=2)
+        _prepare_images(os.path.join(Test.__test_dir, 'b'), other_files_num=2)
+        checkpointed = []
+
+        def read_shape(path, **kwargs):
+            checkpointed.append(os.path.exists(Test.__snapshot_path))
+            return read_shape.original(path, **kwargs)
+
+        read_shape.original = imgshape._read_shape
+        monkeypatch.setattr(imgshape, '_read_shape', read_shape)
+        snapshot = DirectorySnapshot(Test.__test_dir, recursive=True)
+
+        # When
+        with pytest.raises(ValueError):
+            _get_shapes(Test.__test_dir, recursive=True, snapshot=snapshot, checkpoint_file=Test.__snapshot_path,
+                        checkpoint_interval=0)
+
+        # Then
+        assert checkpointed == [False, True, True, True]
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+        os.remove(Test.__snapshot_path)
+
+    def test_get_shapes_checkpoint_without_snapshot(self):
+        """
+        Tests that checkpoints are rejected without directory snapshot.
+        """
+        # Given
+        _prepare_images(Test.__test_dir, img_num=1)
+
+        # When / Then
+        with pytest.raises(ValueError):
+            _get_shapes(Test.__test_dir, checkpoint_file=Test.__snapshot_path)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath('./'))
+
+from imgshape.imgshape import _parse_group_by
+
+
+class Test:
+    def test_parse_group_by_depth(self):
+        """
+        Tests that images are grouped by first N directories of their relative path.
+        """
+        # Given
+        group_of = _parse_group_by('depth=1')
+
+        # When
+        groups = [group_of(os.path.join('train', 'cats', 'a.jpg')),
+                  group_of(os.path.join('val', 'b.jpg')),
+                  group_of('c.jpg')]
+
+        # Then
+        assert groups == ['train', 'val', '.']
+
+    def test_parse_group_by_depth_deeper_than_path(self):
+        """
+        Tests that images in directories shallower than requested depth are grouped by their whole directory.
+        """
+        # Given
+        group_of = _parse_group_by('depth=2')
+
+        # When
+        groups = [group_of(os.path.join('train', 'cats', 'x', 'a.jpg')),
+                  group_of(os.path.join('val', 'b.jpg'))]
+
+        # Then
+        assert groups == ['train/cats', 'val']
+
+    def test_parse_group_by_regex_with_group(self):
+        """
+        Tests that images are grouped by first capturing group of the pattern and non-matching images by root group.
+        """
+        # Given
+        group_of = _parse_group_by(r'regex=_(train|val)_')
+
+        # When
+        groups = [group_of('img_train_1.jpg'),
+                  group_of(os.path.join('x', 'img_val_2.jpg')),
+                  group_of('img_3.jpg')]
+
+        # Then
+        assert groups == ['train', 'val', '.']
+
+    def test_parse_group_by_regex_without_group(self):
+        """
+        Tests that images are grouped by whole match if the pattern has no capturing groups.
+        """
+        # Given
+        group_of = _parse_group_by(r'regex=^[^/]+')
+
+        # When
+        group = group_of(os.path.join('test', 'a.jpg'))
+
+        # Then
+        assert group == 'test'
+
+    @pytest.mark.parametrize('group_by', ['depth', 'depth=0', 'depth=x', 'regex=(', 'dir=1'])
+    def test_parse_group_by_invalid(self, group_by):
+        """
+        Tests that the function raises a ValueError for invalid group specification.
+        """
+        # When/Then
+        with pytest.raises(ValueError):
+            _parse_group_by(group_by)
@@ -0,0 +1,74 @@
+import http.client
+import io
+import os
+import sys
+import threading
+from typing import List
+
+from PIL import Image
+
+sys.path.append(os.path.abspath('./'))
+
+from imgshape.backends import StorageBackend
+from imgshape.imgshape import _BACKEND_WINDOW, _probe_backend_shapes
+from imgshape.progress import ScanProgress
+
+
+class _MemoryBackend(StorageBackend):
+    """
+    Backend serving in-memory images. Reading of files named "broken*" fails with incomplete HTTP response.
+    """
+
+    def __init__(self, files: List[str], workers: int = 2) -> None:
+        buffer = io.BytesIO()
+        Image.new('RGB', (100, 200)).save(buffer, format='PNG')
+        self.image = buffer.getvalue()
+        self.files = files
+        self.workers = workers
+        self.reads = 0
+        self.lock = threading.Lock()
+
+    def list_files(self, directory: str, recursive: bool = False, follow_symlinks: bool = True) -> List[str]:
+        return self.files
+
+    def read_range(self, path: str, start: int, size: int) -> bytes:
+        with self.lock:
+            self.reads += 1
+        if path.startswith('broken'):
+            raise http.client.IncompleteRead(b'')
+        return self.image[start:start + size]
+
+
+class Test:
+    def test_probe_backend_shapes_counts_http_errors(self):
+        """
+        Tests that file failing with HTTP protocol error is counted as error and other files are read.
+        """
+        # Given
+        backend = _MemoryBackend(['a.png', 'broken.png', 'b.png'])
+        progress = ScanProgress(stream=None)
+
+        # When
+        result = list(_probe_backend_shapes(backend, backend.files, progress=progress))
+
+        # Then
+        assert result == [('a.png', 'a.png', (100, 200)), ('b.png', 'b.png', (100, 200))]
+        assert progress.files == 3
+        assert progress.errors == 1
+
+    def test_probe_backend_shapes_reads_ahead_bounded_window(self):
+        """
+        Tests that only a bounded number of files is read ahead of the consumer.
+        """
+        # Given
+        backend = _MemoryBackend([f'{i}.png' for i in range(1000)], workers=2)
+
+        # When
+        probes = _probe_backend_shapes(backend, backend.files)
+        first = next(probes)
+        reads = backend.reads
+        probes.close()
+
+        # Then
+        assert first == ('0.png', '0.png', (100, 200))
+        assert reads <= 2 * _BACKEND_WINDOW
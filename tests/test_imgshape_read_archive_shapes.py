@@ -0,0 +1,137 @@
+import os
+import sys
+import tarfile
+import zipfile
+
+import pytest
+
+sys.path.append(os.path.abspath('./'))
+from tests import _make_dir, _prepare_images, _remove_test_dir
+
+from imgshape.imgshape import _get_shapes, _read_archive_shapes
+from imgshape.progress import ScanProgress
+
+
+class Test:
+    __test_dir = 'test_tmp'
+
+    @staticmethod
+    def _prepare_archive(path: str, files: list) -> None:
+        """
+        Creates archive with given files stored under "split/" directory.
+        :param path: Path to archive. Archive format is chosen by extension.
+        :param files: Files to store in archive.
+        :return: None
+        """
+        if path.endswith('.zip'):
+            with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                for file in files:
+                    zf.write(file, os.path.join('split', os.path.basename(file)))
+        else:
+            with tarfile.open(path, 'w:gz' if path.endswith('.gz') else 'w') as tf:
+                for file in files:
+                    tf.add(file, os.path.join('split', os.path.basename(file)))
+
+    @pytest.mark.parametrize('name', ['images.zip', 'images.tar', 'images.tar.gz'])
+    def test_read_archive_shapes(self, name):
+        """
+        Tests that the function reads shapes of image members and skips other members.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        sources = os.path.join(Test.__test_dir, 'sources')
+        images = _prepare_images(sources, img_num=2, fake_ext_img_num=1, other_files_num=2,
+                                 shape=[(100, 200), (300, 400), (100, 200)])
+        archive = os.path.join(Test.__test_dir, name)
+        Test._prepare_archive(archive, [os.path.join(sources, file) for file in os.listdir(sources)])
+
+        # When
+        result = list(_read_archive_shapes(archive))
+
+        # Then
+        assert sorted(result) == sorted((os.path.join('split', os.path.basename(image)), shape)
+                                        for image, shape in zip(images, [(100, 200), (300, 400), (100, 200)]))
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_read_archive_shapes_corrupted_archive(self):
+        """
+        Tests that the function returns no shapes for corrupted archive.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        archive = os.path.join(Test.__test_dir, 'corrupted.tar')
+        with open(archive, 'wb') as f:
+            f.write(b'corrupted' * 100)
+
+        # When
+        result = list(_read_archive_shapes(archive))
+
+        # Then
+        assert result == []
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    @pytest.mark.parametrize('damage', ['encrypted', 'corrupted'])
+    def test_read_archive_shapes_skips_unreadable_member(self, damage):
+        """
+        Tests that unreadable zip member is skipped and counted as error while other members and images are read.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        sources = _prepare_images('test_tmp_sources', img_num=2, shape=(100, 200))
+        _prepare_images(os.path.join(Test.__test_dir, 'plain'), img_num=1, shape=(800, 600))
+        archive = os.path.join(Test.__test_dir, 'shard.zip')
+        Test._prepare_archive(archive, sources)
+        with zipfile.ZipFile(archive) as zf:
+            bad = zf.infolist()[0]
+        with open(archive, 'r+b') as f:
+            data = bytearray(f.read())
+            if damage == 'encrypted':  # Set encryption flag in central directory entry of the first member
+                central = data.index(b'PK\x01\x02')
+                data[central + 8] |= 0x01
+            else:  # Replace compressed data of the first member with invalid deflate blocks
+                start = bad.header_offset + 30 + len(bad.filename.encode()) + len(bad.extra)
+                data[start:start + bad.compress_size] = b'\xff' * bad.compress_size
+            f.seek(0)
+            f.write(data)
+        progress = ScanProgress(stream=None)
+
+        # When
+        result = list(_read_archive_shapes(archive, progress=progress))
+        shapes = _get_shapes(Test.__test_dir, recursive=True, archives=True)
+
+        # Then
+        assert result == [(zipfile.ZipFile(archive).infolist()[1].filename, (100, 200))]
+        assert progress.errors == 1
+        assert progress.bytes > 0
+        assert shapes == {(100, 200): 1, (800, 600): 1}
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+        _remove_test_dir('test_tmp_sources')
+
+    def test_get_shapes_with_archives(self):
+        """
+        Tests that the function reads shapes of images inside archives and groups them by path inside archive.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        _prepare_images(os.path.join(Test.__test_dir, 'plain'), img_num=1, shape=(800, 600))
+        sources = _prepare_images(os.path.join('test_tmp_sources'), img_num=2, shape=(100, 200))
+        Test._prepare_archive(os.path.join(Test.__test_dir, 'shard.zip'), sources)
+        Test._prepare_archive(os.path.join(Test.__test_dir, 'shard.tar'), sources)
+
+        # When
+        shapes = _get_shapes(Test.__test_dir, recursive=True, group_by='regex=(split|plain)', archives=True)
+        shapes_without_archives = _get_shapes(Test.__test_dir, recursive=True, archives=False)
+
+        # Then
+        assert shapes == {'split': {(100, 200): 4}, 'plain': {(800, 600): 1}}
+        assert shapes_without_archives == {(800, 600): 1}
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+        _remove_test_dir('test_tmp_sources')
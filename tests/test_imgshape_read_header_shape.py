@@ -0,0 +1,73 @@
+import io
+import os
+import sys
+
+from PIL import Image
+
+sys.path.append(os.path.abspath('./'))
+
+from imgshape.imgshape import _read_header_shape
+
+
+class Test:
+    @staticmethod
+    def _reader(data: bytes, requests: list):
+        """
+        Prepares function reading consecutive chunks of data and recording requested sizes.
+        :param data: Data to read.
+        :param requests: List to which requested sizes are appended.
+        :return: Read function.
+        """
+        stream = io.BytesIO(data)
+
+        def read(size: int) -> bytes:
+            requests.append(size)
+            return stream.read(size)
+
+        return read
+
+    def test_read_header_shape_reads_only_header(self):
+        """
+        Tests that the function reads shape from the first bytes of a stream.
+        """
+        # Given
+        data = io.BytesIO()
+        Image.new('RGB', (1000, 800)).save(data, 'PNG')
+        requests = []
+
+        # When
+        shape = _read_header_shape(Test._reader(data.getvalue(), requests), header_bytes=1024)
+
+        # Then
+        assert shape == (1000, 800)
+        assert requests == [1024]
+
+    def test_read_header_shape_with_long_header(self):
+        """
+        Tests that the function reads more bytes if image header does not fit in the first read.
+        """
+        # Given
+        data = io.BytesIO()
+        Image.new('RGB', (320, 240)).save(data, 'JPEG', exif=b'Exif\0\0' + b'\1' * 60000)
+        requests = []
+
+        # When
+        shape = _read_header_shape(Test._reader(data.getvalue(), requests), header_bytes=1024)
+
+        # Then
+        assert shape == (320, 240)
+        assert requests[:3] == [1024, 1024, 2048]
+
+    def test_read_header_shape_not_image(self):
+        """
+        Tests that the function returns None for stream which is not an image.
+        """
+        # Given
+        requests = []
+
+        # When
+        shape = _read_header_shape(Test._reader(b'not an image' * 1000, requests))
+
+        # Then
+        assert shape is None
+        assert len(requests) == 1
@@ -6,7 +6,7 @@ import pytest
 sys.path.append(os.path.abspath('./'))
 from tests import _remove_test_dir
 
-from imgshape.imgshape import _save_csv
+from imgshape.imgshape import _read_csv, _save_csv
 
 
 class Test:
@@ -94,6 +94,27 @@ class Test:
         # Post actions
         _remove_test_dir(Test.__test_dir)
 
+    def test_save_csv_quotes(self):
+        """
+        Tests that the function doubles quotes inside quoted fields, so saved data can be read back.
+        """
+        # Given
+        path = os.path.join(Test.__test_dir, 'valid_path.csv')
+        data = {'key "1"': 'val1', "('a\"b', (10, 20))": '2'}
+        Test._prepare_dir()
+
+        # When
+        _save_csv(path, data)
+
+        # Then
+        with open(path, 'r') as fr:
+            content = fr.read()
+            assert content == '"key ""1""",val1\n"(\'a""b\', (10, 20))",2\n'
+        assert _read_csv(path) == data
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
     def test_save_csv_large_data(self):
         """
         Tests that the function saves large data to a CSV file with a valid path.
@@ -136,3 +157,23 @@ class Test:
 
         # Post actions
         _remove_test_dir(Test.__test_dir)
+
+    def test_save_csv_list_of_rows(self):
+        """
+        Tests that the function saves data given as a list of (key, value) rows.
+        """
+        # Given
+        path = os.path.join(Test.__test_dir, 'rows.csv')
+        data = [('(100, 200)', 2), ("('train', (300, 400))", 1)]
+        Test._prepare_dir()
+
+        # When
+        _save_csv(path, data)
+
+        # Then
+        with open(path, 'r') as fr:
+            content = fr.read()
+            assert content == '"(100, 200)",2\n"(\'train\', (300, 400))",1\n'
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
@@ -0,0 +1,120 @@
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath('./'))
+from tests import _prepare_images, _remove_test_dir
+
+from imgshape.imgshape import _get_picture_list, _get_shapes
+from imgshape.progress import ScanProgress
+
+
+class Test:
+    __test_dir = 'test_tmp'
+
+    def test_scan_progress_counts_probed_files_and_errors(self):
+        """
+        Tests that the scan updates progress counters, counting unreadable images as errors and bytes read by probes.
+        """
+        # Given
+        images = _prepare_images(Test.__test_dir, img_num=3)
+        with open(images[0], 'rb') as f:
+            header = f.read(20)
+        with open(os.path.join(Test.__test_dir, 'broken.jpg'), 'wb') as f:
+            f.write(header)
+        progress = ScanProgress(stream=None)
+
+        # When
+        _get_shapes(Test.__test_dir, progress=progress)
+
+        # Then
+        assert progress.total == 4
+        assert progress.files == 4
+        assert progress.errors == 1
+        assert 0 < progress.bytes <= 4 * io.DEFAULT_BUFFER_SIZE  # Only headers are read
+        assert progress.bytes < sum(os.path.getsize(os.path.join(Test.__test_dir, file))
+                                    for file in os.listdir(Test.__test_dir))
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_scan_progress_counts_listed_files_and_errors(self, monkeypatch):
+        """
+        Tests that listed files and directories which can not be listed are counted while listing.
+        """
+        # Given
+        _prepare_images(Test.__test_dir, img_num=3, other_files_num=2)
+        _prepare_images(os.path.join(Test.__test_dir, 'locked'), img_num=2)
+        scandir = os.scandir
+
+        def failing_scandir(path):
+            if str(path).endswith('locked'):
+                raise PermissionError(path)
+            return scandir(path)
+
+        monkeypatch.setattr(os, 'scandir', failing_scandir)
+        progress = ScanProgress(stream=None)
+
+        # When
+        _get_picture_list(Test.__test_dir, recursive=True, check_content=False, progress=progress)
+
+        # Then
+        assert progress.listed == 5
+        assert progress.errors == 1
+        assert progress.total is None
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_scan_progress_reports_listing(self, monkeypatch):
+        """
+        Tests that listing is reported with number of listed files and that listing updates time of the last progress.
+        """
+        # Given
+        stream = io.StringIO()
+        progress = ScanProgress(stream=stream)
+        now = progress.start_time + 10
+        monkeypatch.setattr(time, 'time', lambda: now)
+
+        # When
+        progress.listed = 5
+        progress.report()
+
+        # Then
+        assert 'Listing files... 5 files, errors: 0' in stream.getvalue()
+        metrics = progress.metrics()
+        assert f'imgshape_scan_last_progress_time_seconds {now}\n' in metrics
+        assert 'imgshape_scan_listed_files 5\n' in metrics
+
+    def test_scan_progress_reports_progress_and_metrics(self):
+        """
+        Tests that progress is printed and exported in Prometheus textfile format when reporting is stopped.
+        """
+        # Given
+        _prepare_images(Test.__test_dir, img_num=1)
+        metrics_file = os.path.join(Test.__test_dir, 'imgshape.prom')
+        stream = io.StringIO()
+        progress = ScanProgress(interval=60, stream=stream, metrics_file=metrics_file)
+
+        # When
+        with progress:
+            progress.listed = progress.total = 10
+            progress.files = 4
+            progress.bytes = 4096
+            progress.errors = 1
+
+        # Then
+        assert '4/10 files' in stream.getvalue()
+        assert 'errors: 1' in stream.getvalue()
+        with open(metrics_file, 'r') as f:
+            metrics = f.read()
+        assert '# TYPE imgshape_scan_probed_files_total counter\nimgshape_scan_probed_files_total 4\n' in metrics
+        assert 'imgshape_scan_probed_bytes_total 4096\n' in metrics
+        assert 'imgshape_scan_errors_total 1\n' in metrics
+        assert 'imgshape_scan_listed_files 10\n' in metrics
+        assert 'imgshape_scan_running 0\n' in metrics
+        assert not os.path.exists(f'{metrics_file}.tmp')
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
@@ -0,0 +1,125 @@
+import os
+import sys
+
+import filetype
+import pytest
+
+sys.path.append(os.path.abspath('./'))
+from tests import _prepare_images, _remove_test_dir
+
+from imgshape import imgshape
+from imgshape.imgshape import _get_shapes
+from imgshape.scheduling import disk_order
+
+
+class Test:
+    __test_dir = 'test_tmp'
+
+    def test_disk_order_sorts_batches_by_inode(self):
+        """
+        Tests that the function returns all files with every batch sorted by inode number.
+        """
+        # Given
+        images = _prepare_images(Test.__test_dir, img_num=10)
+        files = sorted(images, key=lambda path: -os.stat(path).st_ino)
+
+        # When
+        result = list(disk_order(files, order='inode', batch_size=4))
+
+        # Then
+        assert sorted(result) == sorted(files)
+        for start in range(0, len(files), 4):
+            batch = result[start:start + 4]
+            assert sorted(batch) == sorted(files[start:start + 4])
+            assert [os.stat(path).st_ino for path in batch] == sorted(os.stat(path).st_ino for path in batch)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_disk_order_reads_ahead_next_batch(self, monkeypatch):
+        """
+        Tests that readahead of the next batch is requested before files of the current batch are returned.
+        """
+        # Given
+        images = _prepare_images(Test.__test_dir, img_num=6)
+        advised = []
+        monkeypatch.setattr(os, 'posix_fadvise', lambda fd, offset, size, advice: advised.append(advice),
+                            raising=False)
+        monkeypatch.setattr(os, 'POSIX_FADV_WILLNEED', 3, raising=False)
+
+        # When
+        ordered = disk_order(images, order='extent', batch_size=3)
+        first = next(ordered)
+        advised_before_first = len(advised)
+        rest = list(ordered)
+
+        # Then
+        assert sorted([first] + rest) == sorted(images)
+        assert advised_before_first == 6
+        assert advised == [3] * 6
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_disk_order_invalid_order(self):
+        """
+        Tests that the function raises a ValueError for unknown order.
+        """
+        # When/Then
+        with pytest.raises(ValueError):
+            list(disk_order(['a.jpg'], order='random'))
+
+    def test_get_shapes_with_io_order(self):
+        """
+        Tests that reading images in disk order gives the same shapes as reading them in listing order.
+        """
+        # Given
+        img_shapes = [(100, 200), (200, 100), (800, 600), (100, 200)]
+        _prepare_images(Test.__test_dir, img_num=len(img_shapes), shape=img_shapes)
+
+        # When
+        shapes = _get_shapes(Test.__test_dir, io_order='inode')
+
+        # Then
+        assert shapes == _get_shapes(Test.__test_dir)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_get_shapes_first_reads_files_in_disk_order(self, monkeypatch):
+        """
+        Tests that no file is read while listing, so the first read of every file happens in disk order after
+        readahead was requested.
+        """
+        # Given
+        images = _prepare_images(Test.__test_dir, img_num=8, fake_img_num=2, other_files_num=2)
+        events = []
+        guess = filetype.guess
+
+        class RecordingFile(imgshape._CountingFile):
+            def __init__(self, path, *args, **kwargs):
+                events.append(os.path.abspath(path))
+                super().__init__(path, *args, **kwargs)
+
+        def recording_guess(obj):
+            if isinstance(obj, str):
+                events.append(os.path.abspath(obj))
+            return guess(obj)
+
+        monkeypatch.setattr(imgshape, '_CountingFile', RecordingFile)
+        monkeypatch.setattr(filetype, 'guess', recording_guess)
+        monkeypatch.setattr(os, 'posix_fadvise', lambda fd, offset, size, advice: events.append(None), raising=False)
+        monkeypatch.setattr(os, 'POSIX_FADV_WILLNEED', 3, raising=False)
+
+        # When
+        _get_shapes(Test.__test_dir, io_order='inode')
+
+        # Then
+        files = [os.path.abspath(entry.path) for entry in os.scandir(Test.__test_dir)]
+        first_reads = list(dict.fromkeys(event for event in events if event is not None))
+        assert len(images) == 8
+        assert first_reads == sorted(files, key=lambda path: os.stat(path).st_ino)
+        assert events[:len(files)] == [None] * len(files)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
@@ -0,0 +1,101 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath('./'))
+
+from imgshape.stats import QuantileSketch
+
+
+class Test:
+    def test_quantile_sketch_exact_for_small_input(self):
+        """
+        Tests that the sketch returns exact quantiles when all values fit in the sketch.
+        """
+        # Given
+        sketch = QuantileSketch(k=200, seed=1)
+        for value in range(1, 101):
+            sketch.add(value)
+
+        # When
+        result = sketch.quantiles([0, 0.5, 1])
+
+        # Then
+        assert result == [1, 50, 100]
+
+    def test_quantile_sketch_approximate_for_large_input(self):
+        """
+        Tests that the sketch keeps bounded number of samples and approximates quantiles of a large input.
+        """
+        # Given
+        sketch = QuantileSketch(k=200, seed=1)
+        values = list(range(100000))
+        random.Random(2).shuffle(values)
+
+        # When
+        for value in values:
+            sketch.add(value)
+
+        # Then
+        assert sketch.count == 100000
+        assert len(sketch) < 1000
+        for q in (0.1, 0.5, 0.9):
+            assert abs(sketch.quantile(q) - q * 100000) < 2000
+
+    def test_quantile_sketch_weighted_add(self):
+        """
+        Tests that adding value with weight is equivalent to adding it multiple times.
+        """
+        # Given
+        sketch = QuantileSketch(k=200, seed=1)
+
+        # When
+        sketch.add(10, weight=1000)
+        sketch.add(20, weight=3000)
+
+        # Then
+        assert sketch.count == 4000
+        assert sketch.quantiles([0.2, 0.25, 0.3, 0.9]) == [10, 10, 20, 20]
+
+    def test_quantile_sketch_merge(self):
+        """
+        Tests that merged sketches approximate quantiles of all values.
+        """
+        # Given
+        first = QuantileSketch(k=200, seed=1)
+        second = QuantileSketch(k=200, seed=2)
+        for value in range(50000):
+            first.add(value)
+            second.add(value + 50000)
+
+        # When
+        first.merge(second)
+
+        # Then
+        assert first.count == 100000
+        assert len(first) < 1000
+        assert abs(first.quantile(0.5) - 50000) < 2000
+
+    def test_quantile_sketch_empty(self):
+        """
+        Tests that empty sketch returns None quantiles.
+        """
+        # Given
+        sketch = QuantileSketch()
+
+        # When/Then
+        assert sketch.quantile(0.5) is None
+
+    def test_quantile_sketch_invalid_quantile(self):
+        """
+        Tests that the sketch raises a ValueError for quantiles out of range.
+        """
+        # Given
+        sketch = QuantileSketch()
+        sketch.add(1)
+
+        # When/Then
+        with pytest.raises(ValueError):
+            sketch.quantile(1.5)
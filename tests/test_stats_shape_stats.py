@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath('./'))
+
+from imgshape.stats import ShapeStats
+
+
+class Test:
+    def test_shape_stats_min_max_and_buckets(self):
+        """
+        Tests that statistics keep exact minimum and maximum and count aspect ratios and megapixels.
+        """
+        # Given
+        stats = ShapeStats(seed=1)
+
+        # When
+        stats.add(1920, 1080)
+        stats.add(800, 600, count=2)
+        stats.add(100, 100)
+
+        # Then
+        assert stats.count == 4
+        assert stats.minimum == {'width': 100, 'height': 100, 'megapixels': 0.01}
+        assert stats.maximum == {'width': 1920, 'height': 1080, 'megapixels': 1920 * 1080 / 1e6}
+        assert stats.aspect_ratios == {'16:9': 1, '4:3': 2, '1:1': 1}
+        assert stats.megapixel_ranges == {'2-5 MP': 1, '0.3-1 MP': 2, '<0.1 MP': 1}
+        assert stats.sketches['width'].quantile(0.5) == 800
+
+    def test_shape_stats_add_grouped_shapes(self):
+        """
+        Tests that statistics can be calculated from grouped shapes dictionary.
+        """
+        # Given
+        stats = ShapeStats(seed=1)
+
+        # When
+        stats.add_shapes({'train': {(100, 200): 3}, 'val': {(400, 100): 1}})
+
+        # Then
+        assert stats.count == 4
+        assert stats.minimum['width'] == 100
+        assert stats.maximum['width'] == 400
+        assert stats.aspect_ratios == {'1:2': 3, '4:1': 1}
+
+    def test_shape_stats_merge(self):
+        """
+        Tests that merged statistics are equal to statistics collected from all shapes.
+        """
+        # Given
+        first = ShapeStats(seed=1)
+        first.add(100, 200)
+        second = ShapeStats(seed=1)
+        second.add(300, 50, count=2)
+
+        # When
+        first.merge(second)
+
+        # Then
+        assert first.count == 3
+        assert first.minimum == {'width': 100, 'height': 50, 'megapixels': 0.015}
+        assert first.maximum == {'width': 300, 'height': 200, 'megapixels': 0.02}
+        assert first.aspect_ratios == {'1:2': 1, '>4:1': 2}
+
+    def test_shape_stats_serialization(self):
+        """
+        Tests that statistics can be printed as JSON and text.
+        """
+        # Given
+        stats = ShapeStats(seed=1)
+        stats.add(800, 600)
+
+        # When
+        data = json.loads(json.dumps(stats.to_dict()))
+        text = stats.format_text()
+
+        # Then
+        assert data['count'] == 1
+        assert data['quantiles']['height']['0.5'] == 600
+        assert text.startswith('Images: 1\nWidth: min=800, max=800')
@@ -0,0 +1,79 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath('./'))
+from tests import _make_dir, _prepare_images, _remove_test_dir
+
+from imgshape.histogram import ShapeHistogram
+from imgshape.watch import ShapeIndex
+
+
+class Test:
+    __test_dir = 'test_tmp'
+
+    def test_shape_index_update_and_remove(self):
+        """
+        Tests that the index counts probed images and decrements counts of removed ones.
+        """
+        # Given
+        images = _prepare_images(Test.__test_dir, img_num=3, other_files_num=1,
+                                 shape=[(100, 200), (100, 200), (300, 400)])
+        index = ShapeIndex(Test.__test_dir)
+        for image in images:
+            index.update(image)
+
+        # When
+        changed = index.remove(images[2])
+
+        # Then
+        assert changed
+        assert isinstance(index.shapes, ShapeHistogram)
+        assert index.shapes == {(100, 200): 2}
+        assert not index.remove(images[2])
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_shape_index_update_modified_image(self):
+        """
+        Tests that the index replaces shape of modified image instead of counting it twice.
+        """
+        # Given
+        images = _prepare_images(Test.__test_dir, img_num=1, shape=(100, 200))
+        index = ShapeIndex(Test.__test_dir)
+        index.update(images[0])
+        with open(images[0], 'wb') as f:
+            f.write(b'not an image')
+
+        # When
+        changed = index.update(images[0])
+
+        # Then
+        assert changed
+        assert index.shapes == {}
+        assert index.files == {}
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_shape_index_grouped_remove_dir(self):
+        """
+        Tests that the index forgets all images of removed directory and drops empty groups.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        train = _prepare_images(os.path.join(Test.__test_dir, 'train'), img_num=2, shape=(100, 200))
+        val = _prepare_images(os.path.join(Test.__test_dir, 'val'), img_num=1, shape=(300, 400))
+        index = ShapeIndex(Test.__test_dir, group_by='depth=1')
+        index.apply([('update', image) for image in train + val])
+
+        # When
+        changed = index.apply([('remove_dir', os.path.abspath(os.path.join(Test.__test_dir, 'val')))])
+
+        # Then
+        assert changed
+        assert index.shapes == {'train': {(100, 200): 2}}
+        assert isinstance(index.shapes['train'], ShapeHistogram)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
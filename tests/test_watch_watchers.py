@@ -0,0 +1,210 @@
+import ctypes
+import errno
+import os
+import sys
+import threading
+import time
+
+import pytest
+from matplotlib import pyplot as plt
+from PIL import Image
+
+sys.path.append(os.path.abspath('./'))
+from tests import _make_dir, _prepare_images, _remove_test_dir
+
+from imgshape.watch import InotifyWatcher, PollingWatcher, _flush, watch_shapes
+
+
+def _inotify_available() -> bool:
+    """
+    Checks if inotify watcher can be created.
+    :return: True if inotify is available.
+    """
+    try:
+        InotifyWatcher('.').close()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+class _LimitedLibc:
+    """
+    Libc wrapper failing inotify_add_watch with given error after given number of watches.
+    """
+
+    def __init__(self, libc: ctypes.CDLL, limit: int, error: int) -> None:
+        self.libc = libc
+        self.limit = limit
+        self.error = error
+
+    def inotify_add_watch(self, fd: int, path: bytes, mask: int) -> int:
+        if self.limit <= 0:
+            ctypes.set_errno(self.error)
+            return -1
+        self.limit -= 1
+        return self.libc.inotify_add_watch(fd, path, mask)
+
+    def __getattr__(self, name: str):
+        return getattr(self.libc, name)
+
+
+class Test:
+    __test_dir = 'test_tmp'
+
+    def test_polling_watcher_reports_created_modified_and_deleted_files(self):
+        """
+        Tests that the polling watcher reports changes of files since the previous scan.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        images = _prepare_images(os.path.join(Test.__test_dir, 'nested'), img_num=2)
+        watcher = PollingWatcher(Test.__test_dir, recursive=True, interval=0)
+        initial = watcher.scan()
+        os.remove(images[0])
+        created = os.path.abspath(os.path.join(Test.__test_dir, 'new.png'))
+        Image.new('RGB', (10, 20)).save(created)
+        time.sleep(0.01)
+        Image.new('RGB', (30, 40)).save(images[1])
+
+        # When
+        changes = watcher.scan()
+
+        # Then
+        assert sorted(initial) == sorted(('update', image) for image in images)
+        assert sorted(changes) == sorted([('remove', images[0]), ('update', created), ('update', images[1])])
+        assert watcher.scan() == []
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    @pytest.mark.skipif(not _inotify_available(), reason='inotify is not available')
+    def test_inotify_watcher_reports_created_and_deleted_files(self):
+        """
+        Tests that the inotify watcher reports created files, files in created directories and deleted files.
+        """
+        # Given
+        images = _prepare_images(Test.__test_dir, img_num=1)
+        watcher = InotifyWatcher(Test.__test_dir, recursive=True)
+        initial = watcher.scan()
+        os.remove(images[0])
+        nested = os.path.abspath(os.path.join(Test.__test_dir, 'nested'))
+        os.mkdir(nested)
+        Image.new('RGB', (10, 20)).save(os.path.join(nested, 'a.png'))
+
+        # When
+        expected = [('remove', images[0]), ('update', os.path.join(nested, 'a.png'))]
+        changes = []
+        deadline = time.monotonic() + 2
+        while not all(change in changes for change in expected) and time.monotonic() < deadline:
+            changes.extend(watcher.changes(0.1))
+        watcher.close()
+
+        # Then
+        assert initial == [('update', images[0])]
+        assert all(change in changes for change in expected)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_watch_shapes_with_polling(self):
+        """
+        Tests that watching keeps saved shapes up to date with created files.
+        """
+        # Given
+        _prepare_images(Test.__test_dir, img_num=2, shape=(100, 200))
+        save_file = os.path.join(Test.__test_dir, 'shapes.csv')
+        stop = threading.Event()
+        result = {}
+
+        def watch():
+            result.update(watch_shapes(Test.__test_dir, save_file=save_file, flush_interval=0, poll_interval=0.05,
+                                       polling=True, stop=stop))
+
+        # When
+        thread = threading.Thread(target=watch)
+        thread.start()
+        time.sleep(0.2)
+        Image.new('RGB', (300, 400)).save(os.path.join(Test.__test_dir, 'new.png'))
+        time.sleep(0.3)
+        stop.set()
+        thread.join()
+
+        # Then
+        assert result == {(100, 200): 2, (300, 400): 1}
+        with open(save_file, 'r') as f:
+            assert f.read() == '"(100, 200)",2\n"(300, 400)",1\n'
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    @pytest.mark.skipif(not _inotify_available(), reason='inotify is not available')
+    def test_inotify_watcher_lists_directories_which_can_not_be_watched(self):
+        """
+        Tests that files of directories which can not be watched are still reported by the initial scan.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        images = _prepare_images(os.path.join(Test.__test_dir, 'a'), img_num=1)
+        images += _prepare_images(os.path.join(Test.__test_dir, 'b'), img_num=1)
+        watcher = InotifyWatcher(Test.__test_dir, recursive=True)
+        watcher._libc = _LimitedLibc(watcher._libc, limit=1, error=errno.EACCES)
+
+        # When
+        changes = watcher.scan()
+        watcher.close()
+
+        # Then
+        assert sorted(changes) == sorted(('update', image) for image in images)
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    @pytest.mark.skipif(not _inotify_available(), reason='inotify is not available')
+    def test_watch_shapes_falls_back_to_polling_when_watches_limit_is_reached(self, monkeypatch, capsys):
+        """
+        Tests that watching switches to polling and keeps all shapes when the limit of inotify watches is reached.
+        """
+        # Given
+        _make_dir(Test.__test_dir)
+        _prepare_images(os.path.join(Test.__test_dir, 'a'), img_num=1, shape=(100, 200))
+        _prepare_images(os.path.join(Test.__test_dir, 'b'), img_num=1, shape=(300, 400))
+        init = InotifyWatcher.__init__
+
+        def limited_init(self, *args, **kwargs):
+            init(self, *args, **kwargs)
+            self._libc = _LimitedLibc(self._libc, limit=2, error=errno.ENOSPC)
+
+        monkeypatch.setattr(InotifyWatcher, '__init__', limited_init)
+        stop = threading.Event()
+        stop.set()
+
+        # When
+        result = watch_shapes(Test.__test_dir, recursive=True, flush_interval=0, poll_interval=0.05, stop=stop)
+
+        # Then
+        assert result == {(100, 200): 1, (300, 400): 1}
+        assert 'Falling back to polling' in capsys.readouterr().err
+
+        # Post actions
+        _remove_test_dir(Test.__test_dir)
+
+    def test_flush_replaces_plot_hover_handler(self):
+        """
+        Tests that refreshing the plot disconnects hover handler of the previous plot.
+        """
+        # Given
+        plt.switch_backend('Agg')
+        plt.figure()
+        callbacks = plt.gcf().canvas.callbacks.callbacks
+        handlers_before = len(callbacks.get('motion_notify_event', {}))
+        handler = None
+
+        # When
+        for _ in range(5):
+            handler = _flush({(100, 200): 2, (300, 400): 1}, None, True, 'overlay', handler)
+
+        # Then
+        assert len(callbacks.get('motion_notify_event', {})) == handlers_before + 1
+
+        # Post actions
+        plt.close()